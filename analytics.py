@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+
+from storage import write_text_atomic
+
+# =========================
+# Assignment analytics (daily sheets se)
+# har din ka summary data/analytics/<day>.json me cache hota hai;
+# aaj ki file append-only hai, isliye sirf naye bytes parse hote hain
+# =========================
+SUMMARY_VERSION = 1
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+def _new_entity() -> dict:
+    # ttc = time-to-copy histogram {seconds: count}, hours = copies per hour of day
+    return {"assigned": 0, "done": 0, "cancelled": 0, "expired": 0, "removed": 0, "ttc": {}, "hours": {}}
+
+def _new_summary() -> dict:
+    return {"version": SUMMARY_VERSION, "offset": 0, "open": {}, "names": {}, "entities": {"all": _new_entity()}}
+
+def _ts(s: str) -> float | None:
+    try:
+        return datetime.strptime(s, TIME_FMT).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def _bump(summary: dict, keys: list[str], field: str, ttc: int | None = None, hour: int | None = None):
+    ents = summary["entities"]
+    for k in keys:
+        e = ents.get(k)
+        if e is None:
+            e = ents[k] = _new_entity()
+        e[field] += 1
+        if ttc is not None:
+            e["ttc"][str(ttc)] = e["ttc"].get(str(ttc), 0) + 1
+        if hour is not None:
+            e["hours"][str(hour)] = e["hours"].get(str(hour), 0) + 1
+
+def _apply_row(summary: dict, row: dict[str, str]):
+    status = row.get("status", "")
+    eid = row.get("employee_id", "")
+    by = row.get("by_id", "")
+    keys = ["all", f"emp:{eid}"]
+    if by:
+        keys.append(f"by:{by}")
+    summary["names"][f"emp:{eid}"] = row.get("employee_name", "")
+    if by:
+        summary["names"][f"by:{by}"] = row.get("by_name", "")
+
+    open_key = f"{eid}|{row.get('link', '')}"
+    if status == "pending":
+        summary["open"][open_key] = _ts(row.get("sent_time", ""))
+        _bump(summary, keys, "assigned")
+        return
+
+    sent = summary["open"].pop(open_key, None)
+    if status == "done":
+        done = _ts(row.get("done_time", ""))
+        ttc = int(done - sent) if done is not None and sent is not None and done >= sent else None
+        hour = datetime.fromtimestamp(done).hour if done is not None else None
+        _bump(summary, keys, "done", ttc=ttc, hour=hour)
+    elif status == "cancelled":
+        _bump(summary, keys, "cancelled")
+    elif status == "expired":
+        _bump(summary, keys, "removed" if row.get("note", "").startswith("Manual") else "expired")
+
+def summarize_day(data_dir: str, day: date, cache_dir: str) -> dict | None:
+    path = os.path.join(data_dir, f"{day:%Y-%m-%d}.csv")
+    cache = os.path.join(cache_dir, f"{day:%Y-%m-%d}.json")
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+
+    summary = None
+    try:
+        with open(cache, "r", encoding="utf-8") as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if not summary or summary.get("version") != SUMMARY_VERSION or summary.get("offset", 0) > size:
+        summary = _new_summary()
+    if summary["offset"] == size:
+        return summary
+
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = max(summary["offset"], len(header))
+        f.seek(start)
+        chunk = f.read(size - start)
+    # only complete lines; a half-flushed last row is picked up next time
+    end = chunk.rfind(b"\n") + 1
+    fieldnames = next(csv.reader([header.decode("utf-8-sig").strip()]))
+    for row in csv.DictReader(io.StringIO(chunk[:end].decode("utf-8", "replace"), newline=""), fieldnames=fieldnames):
+        _apply_row(summary, row)
+    summary["offset"] = start + end
+
+    write_text_atomic(cache, json.dumps(summary, separators=(",", ":")), suffix=".json")
+    return summary
+
+def merge_summaries(summaries: list[dict]) -> tuple[dict[str, dict], dict[str, str]]:
+    merged: dict[str, dict] = {}
+    names: dict[str, str] = {}
+    for s in summaries:
+        names.update(s.get("names", {}))
+        for k, e in s["entities"].items():
+            m = merged.get(k)
+            if m is None:
+                m = merged[k] = _new_entity()
+            for f in ("assigned", "done", "cancelled", "expired", "removed"):
+                m[f] += e.get(f, 0)
+            for f in ("ttc", "hours"):
+                for b, n in e.get(f, {}).items():
+                    m[f][b] = m[f].get(b, 0) + n
+    return merged, names
+
+def summarize_range(data_dir: str, days: list[date], cache_dir: str) -> tuple[dict[str, dict], dict[str, str], int]:
+    # -> (merged entities, names, days with data)
+    found = [s for s in (summarize_day(data_dir, d, cache_dir) for d in days) if s is not None]
+    merged, names = merge_summaries(found)
+    return merged, names, len(found)
+
+def percentile(hist: dict[str, int], q: float) -> int | None:
+    total = sum(hist.values())
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for sec in sorted(hist, key=int):
+        seen += hist[sec]
+        if seen >= rank:
+            return int(sec)
+    return None
+
+def _line(name: str, e: dict) -> str:
+    a = e["assigned"] or 1
+    p = [percentile(e["ttc"], q) for q in (0.5, 0.9, 0.99)]
+    ttc = "/".join("-" if v is None else f"{v}s" for v in p)
+    hours = e["hours"]
+    peak = max(hours.values()) if hours else 0
+    per_hr = e["done"] / len(hours) if hours else 0.0
+    return (
+        f"{name}: {e['assigned']} sent | {e['done']} copied\n"
+        f"  ⏱ p50/p90/p99: {ttc}\n"
+        f"  🔁 cancel {e['cancelled'] / a:.0%} | ♻️ expire {e['expired'] / a:.0%} | 🗑 remove {e['removed'] / a:.0%}\n"
+        f"  📈 {per_hr:.1f}/active hr | peak {peak}/hr"
+    )
+
+def format_report(merged: dict[str, dict], names: dict[str, str], label: str, days: int,
+                  top: int = 10, max_chars: int = 4000) -> str:
+    allv = merged.get("all") or _new_entity()
+    out = [f"📊 ANALYTICS {label} ({days} day{'s' if days != 1 else ''})\n", _line("ALL", allv)]
+
+    for prefix, title in (("emp:", "👤 EMPLOYEES"), ("by:", "📦 CONTRIBUTORS")):
+        rows = sorted(((k, e) for k, e in merged.items() if k.startswith(prefix)),
+                      key=lambda kv: -kv[1]["assigned"])
+        if not rows:
+            continue
+        out.append(f"\n{title} (top {min(top, len(rows))}/{len(rows)})")
+        for k, e in rows[:top]:
+            out.append(_line(names.get(k) or k[len(prefix):], e))
+
+    text = "\n".join(out)
+    if len(text) > max_chars:
+        text = text[:max_chars - 2] + "\n…"
+    return text
@@ -0,0 +1,513 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Iterator
+
+from daystats import DayCounters, DayStats, SENDER_FIELDS, USER_FIELDS, today_str
+from perf import metrics
+from pool import Contributor, LinkItem, LinkPool, POOL_MODES, contributor
+from store import StateJournal
+
+# =========================
+# State backend: pool + assignments + day counters
+#   memory - ek process, LinkPool + dicts, journal/snapshot se durable
+#   sqlite - kai worker processes ek hi DB file share karte hain;
+#            har transition ek transaction (BEGIN IMMEDIATE), pop exactly-once
+# saare transitions yahan; main.py sirf side effects (sheet, notify, panel) karta hai
+# =========================
+BACKENDS = ("memory", "sqlite")
+# sqlite write lock wait inside a transition (event loop blocked meanwhile); longer waits -> BackendBusy
+SQLITE_BUSY_TIMEOUT = 0.05
+SQLITE_OPEN_TIMEOUT = 5.0
+
+class BackendBusy(Exception):
+    # another worker holds the shared DB's write lock; nothing changed, safe to retry later
+    pass
+
+# times are epoch seconds (float): shared across workers / restarts, and compared with time.time()
+@dataclass(frozen=True, slots=True)
+class PendingLink:
+    url: str
+    by: Contributor
+    sent_time: float
+    expiry_time: float
+    request_after: float
+    actions_until: float
+
+    @property
+    def by_id(self) -> int:
+        return self.by.by_id
+
+    @property
+    def by_name(self) -> str:
+        return self.by.by_name
+
+PENDING_TIME_FIELDS = ("sent_time", "expiry_time", "request_after", "actions_until")
+
+def pending_to_dict(pl: PendingLink) -> dict[str, Any]:
+    d: dict[str, Any] = {"url": pl.url, "by_id": pl.by.by_id, "by_name": pl.by.by_name}
+    for k in PENDING_TIME_FIELDS:
+        d[k] = getattr(pl, k)
+    return d
+
+def pending_from_dict(d: dict[str, Any]) -> PendingLink:
+    return PendingLink(d["url"], contributor(d["by_id"], d["by_name"]),
+                       *(float(d[k]) for k in PENDING_TIME_FIELDS))
+
+def same_assignment(a: PendingLink, b: PendingLink) -> bool:
+    return a.url == b.url and abs(a.sent_time - b.sent_time) < 0.001
+
+# finish op -> stats field (user + contributor); drop = employee removed, not counted
+FINISH_STAT_FIELDS = {"done": "copied", "cancel": "cancelled", "expire": "expired", "remove": "expired"}
+# these put the link back in the pool, the rest take it out for good
+FINISH_RETURNS = ("cancel", "expire")
+
+MakePending = Callable[[LinkItem], PendingLink]
+
+def _encode(obj: Any) -> dict[str, Any]:
+    if isinstance(obj, LinkItem):
+        return obj.to_dict()
+    if isinstance(obj, PendingLink):
+        return pending_to_dict(obj)
+    raise TypeError(f"not JSON serializable: {type(obj).__name__}")
+
+# =========================
+# In-process backend
+# =========================
+class MemoryBackend:
+    shared = False
+
+    def __init__(self, data_dir: str, mode: str = "fifo", weights: dict[int, float] | None = None,
+                 keep_days: int = 7, compact_every: int = 20000):
+        self.pool = LinkPool(mode, weights)
+        self.pending: dict[int, PendingLink] = {}
+        self.day_stats = DayStats(keep_days)
+        self.journal = StateJournal(data_dir, self.snapshot, compact_every=compact_every, encode=_encode)
+        self._restored_snap: dict[str, Any] | None = None     # rotated at startup, not written yet
+
+    # ---- pool ----
+    @property
+    def mode(self) -> str:
+        return self.pool.mode
+
+    @property
+    def weights(self) -> dict[int, float]:
+        return self.pool.weights
+
+    def set_mode(self, mode: str):
+        # journaled -> survives restart (same as the mode row in SqliteBackend's meta)
+        self.pool.set_mode(mode)
+        self.journal.record("mode", mode=mode)
+
+    def set_weight(self, by_id: int, weight: float):
+        self.pool.set_weight(by_id, weight)
+
+    def queued(self) -> int:
+        return len(self.pool)
+
+    def pool_items(self) -> list[LinkItem]:
+        return list(self.pool)
+
+    def backlog(self) -> list[tuple[int, str, int]]:
+        return self.pool.backlog()
+
+    def add_links(self, by_id: int, by_name: str, urls: list[str]) -> list[str]:
+        by = contributor(by_id, by_name)
+        added = [u for u in urls if self.pool.add(u, by)]
+        if len(added) == 1:
+            self.journal.record("add", url=added[0], by_id=by.by_id, by_name=by.by_name)
+        elif added:
+            self.journal.record("add_batch", urls=added, by_id=by.by_id, by_name=by.by_name)
+        if added:
+            self.day_stats.today().bump_sender(by.by_id, by.by_name, "added", len(added))
+        return added
+
+    # ---- assignments ----
+    def get(self, user_id: int) -> PendingLink | None:
+        return self.pending.get(user_id)
+
+    def pending_users(self) -> list[int]:
+        return list(self.pending)
+
+    def pending_count(self) -> int:
+        return len(self.pending)
+
+    def due(self, now: float) -> list[int]:
+        return [uid for uid, pl in self.pending.items() if pl.expiry_time <= now]
+
+    def take(self, user_id: int, make: MakePending) -> tuple[PendingLink | None, PendingLink | None]:
+        # next link -> user; an active old link counts as done. -> (new, old)
+        item = self.pool.pop()
+        if item is None:
+            return None, None
+        old = self.finish(user_id, "done")
+        pl = make(item)
+        self.pending[user_id] = pl
+        self.journal.record("assign", user=user_id, **pending_to_dict(pl))
+        self.day_stats.today().bump_user(user_id, "sent")
+        return pl, old
+
+    def finish(self, user_id: int, op: str, expect: PendingLink | None = None) -> PendingLink | None:
+        # None = nothing active (or it's a different assignment than `expect`)
+        pl = self.pending.get(user_id)
+        if pl is None or (expect is not None and not same_assignment(pl, expect)):
+            return None
+        del self.pending[user_id]
+        self.journal.record(op, user=user_id)
+        if op in FINISH_RETURNS:
+            self.pool.give_back(pl.url, pl.by)
+        else:
+            self.pool.release(pl.url)
+        field = FINISH_STAT_FIELDS.get(op)
+        if field:
+            dc = self.day_stats.today()
+            dc.bump_user(user_id, field)
+            dc.bump_sender(pl.by_id, pl.by_name, field)
+        return pl
+
+    # ---- counters ----
+    def user_stats(self, user_id: int, day: str | None = None) -> dict[str, int]:
+        dc = self.day_stats.day(day) if day else self.day_stats.today()
+        return dc.user(user_id)
+
+    def counters(self, day: str | None = None) -> DayCounters | None:
+        # None = day not kept in memory (caller rebuilds from the sheet)
+        return self.day_stats.get(day) if day else self.day_stats.today()
+
+    # ---- persistence (journal + snapshot) ----
+    # compaction is never inside a transition: a job calls begin_compact() on the loop
+    # (so the snapshot sees whole transitions only) and end_compact() in a storage thread
+    def compact_due(self) -> bool:
+        return self._restored_snap is not None or self.journal.compact_due
+
+    def begin_compact(self) -> dict[str, Any]:
+        if self._restored_snap is not None:
+            snap, self._restored_snap = self._restored_snap, None
+            return snap
+        return self.journal.begin_compact()
+
+    def end_compact(self, snap: dict[str, Any]):
+        self.journal.write_snapshot(snap)
+
+    def snapshot(self) -> dict[str, Any]:
+        # items / assignments are frozen -> shared as-is, turned into JSON later by _encode
+        return {
+            "mode": self.pool.mode,
+            "pool": list(self.pool),
+            "pending": dict(self.pending),
+            "day_stats": self.day_stats.to_dict(),
+        }
+
+    def _replay(self, ev: dict[str, Any], pool: dict[str, Contributor]):
+        op = ev["op"]
+        # counters go to the day the event happened
+        dc = self.day_stats.day(date.fromtimestamp(ev["t"]).strftime("%Y-%m-%d")) if "t" in ev \
+            else self.day_stats.today()
+        if op == "add":
+            by = pool[ev["url"]] = contributor(ev["by_id"], ev["by_name"])
+            dc.bump_sender(by.by_id, by.by_name, "added")
+            return
+        if op == "mode":
+            self.pool.set_mode(ev["mode"])      # pool is still empty here, load() ranks under it
+            return
+        if op == "add_batch":
+            by = contributor(ev["by_id"], ev["by_name"])
+            for url in ev["urls"]:
+                pool[url] = by
+            dc.bump_sender(by.by_id, by.by_name, "added", len(ev["urls"]))
+            return
+
+        user_id = ev["user"]
+        if op == "assign":
+            pool.pop(ev["url"], None)
+            self.pending[user_id] = pending_from_dict(ev)
+            dc.bump_user(user_id, "sent")
+            return
+
+        pl = self.pending.pop(user_id, None)
+        if not pl:
+            return
+        field = FINISH_STAT_FIELDS.get(op)
+        if field:
+            dc.bump_user(user_id, field)
+            dc.bump_sender(pl.by_id, pl.by_name, field)
+        if op in FINISH_RETURNS and pl.url not in pool:
+            pool[pl.url] = pl.by
+
+    def restore(self):
+        snap, events = self.journal.load()
+        # url -> contributor, insertion order = pool order
+        pool: dict[str, Contributor] = {}
+        if snap:
+            if snap.get("mode") in POOL_MODES:
+                self.pool.set_mode(snap["mode"])
+            pool = {it["url"]: contributor(it["by_id"], it["by_name"]) for it in snap.get("pool", [])}
+            for uid, d in snap.get("pending", {}).items():
+                self.pending[int(uid)] = pending_from_dict(d)
+            self.day_stats.load(snap.get("day_stats", {}))
+
+        replayed = 0
+        for ev in events:
+            self._replay(ev, pool)
+            replayed += 1
+
+        self.pool.load(list(pool.items()), {pl.url for pl in self.pending.values()})
+        # startup only rotates the journal; the snapshot is written by the first compact job
+        # (crash before that: the rotated journal is replayed again, nothing lost)
+        if replayed:
+            self._restored_snap = self.journal.begin_compact()
+
+    def close(self):
+        self._restored_snap = None      # superseded by this full snapshot
+        self.journal.compact()
+        self.journal.close()
+
+# =========================
+# Shared SQLite backend (multiple worker processes, one DB file)
+# pool order: har link ka virtual time (vt), pop = sabse chhota (vt, seq)
+#   fifo: vt = seq | rr: har contributor +1 | wfq: har contributor +1/weight
+# =========================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    url TEXT PRIMARY KEY, by_id INTEGER NOT NULL, by_name TEXT NOT NULL,
+    out INTEGER NOT NULL DEFAULT 0, vt REAL NOT NULL, seq INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS links_queue ON links(vt, seq) WHERE out = 0;
+CREATE TABLE IF NOT EXISTS pending (
+    user_id INTEGER PRIMARY KEY, url TEXT NOT NULL, by_id INTEGER NOT NULL, by_name TEXT NOT NULL,
+    sent_time REAL NOT NULL, expiry_time REAL NOT NULL, request_after REAL NOT NULL, actions_until REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS pending_expiry ON pending(expiry_time);
+-- a link can be held by one employee at a time, enforced by the DB
+CREATE UNIQUE INDEX IF NOT EXISTS pending_url ON pending(url);
+CREATE TABLE IF NOT EXISTS senders (by_id INTEGER PRIMARY KEY, next_vt REAL NOT NULL DEFAULT 0, weight REAL);
+CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v);
+CREATE TABLE IF NOT EXISTS counters (
+    day TEXT NOT NULL, kind TEXT NOT NULL, id INTEGER NOT NULL, name TEXT NOT NULL DEFAULT '',
+    sent INTEGER NOT NULL DEFAULT 0, copied INTEGER NOT NULL DEFAULT 0, cancelled INTEGER NOT NULL DEFAULT 0,
+    expired INTEGER NOT NULL DEFAULT 0, added INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, kind, id));
+"""
+_COUNTER_FIELDS = ("sent", "copied", "cancelled", "expired", "added")
+_PENDING_COLS = "url, by_id, by_name, " + ", ".join(PENDING_TIME_FIELDS)
+
+class SqliteBackend:
+    shared = True
+
+    def __init__(self, path: str, mode: str = "fifo", weights: dict[int, float] | None = None,
+                 busy_timeout: float = SQLITE_BUSY_TIMEOUT):
+        if mode not in POOL_MODES:
+            raise ValueError(f"unknown pool mode: {mode}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        # setup (before the loop runs) may wait longer; then short waits only
+        self.db = sqlite3.connect(path, timeout=SQLITE_OPEN_TIMEOUT, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        with self._tx() as c:
+            # first worker decides the mode; later ones (and restarts) follow the DB until /poolmode
+            c.execute("INSERT OR IGNORE INTO meta(k, v) VALUES ('mode', ?), ('seq', 0), ('vclock', 0.0)", (mode,))
+            for by_id, w in (weights or {}).items():
+                c.execute("INSERT INTO senders(by_id, weight) VALUES (?, ?) "
+                          "ON CONFLICT(by_id) DO UPDATE SET weight = excluded.weight", (by_id, w))
+        self.db.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE = write lock up front, so read-then-update can't interleave across workers
+        with metrics.timer("disk_seconds", op="sqlite_tx"):
+            try:
+                self.db.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                metrics.inc("sqlite_busy_total")
+                raise BackendBusy(str(e)) from None
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def _meta(self, k: str) -> Any:
+        return self.db.execute("SELECT v FROM meta WHERE k = ?", (k,)).fetchone()[0]
+
+    def _set_meta(self, k: str, v: Any):
+        self.db.execute("UPDATE meta SET v = ? WHERE k = ?", (v, k))
+
+    def _bump(self, kind: str, id_: int, field: str, n: int = 1, name: str = ""):
+        self.db.execute(
+            f"INSERT INTO counters(day, kind, id, name, {field}) VALUES (?, ?, ?, ?, ?) "
+            f"ON CONFLICT(day, kind, id) DO UPDATE SET {field} = {field} + excluded.{field}, "
+            f"name = CASE WHEN excluded.name != '' THEN excluded.name ELSE name END",
+            (today_str(), kind, id_, name, n),
+        )
+
+    def _enqueue(self, url: str, by_id: int, by_name: str, mode: str, new: bool) -> bool:
+        # new link: rejected if already queued or assigned (same as LinkPool.add)
+        if new and self.db.execute("SELECT 1 FROM links WHERE url = ?", (url,)).fetchone():
+            return False
+        seq = self._meta("seq") + 1
+        self._set_meta("seq", seq)
+        if mode == "fifo":
+            vt = float(seq)
+        else:
+            row = self.db.execute("SELECT next_vt, weight FROM senders WHERE by_id = ?", (by_id,)).fetchone()
+            next_vt, w = row if row else (0.0, None)
+            step = 1.0 if mode == "rr" else 1.0 / max(w or 1.0, 1e-6)
+            vt = max(next_vt, self._meta("vclock"))
+            self.db.execute("INSERT INTO senders(by_id, next_vt) VALUES (?, ?) "
+                            "ON CONFLICT(by_id) DO UPDATE SET next_vt = excluded.next_vt", (by_id, vt + step))
+        if new:
+            self.db.execute("INSERT INTO links(url, by_id, by_name, vt, seq) VALUES (?, ?, ?, ?, ?)",
+                            (url, by_id, by_name, vt, seq))
+            return True
+        self.db.execute("UPDATE links SET out = 0, vt = ?, seq = ? WHERE url = ?", (vt, seq, url))
+        return True
+
+    # ---- pool ----
+    @property
+    def mode(self) -> str:
+        return self._meta("mode")
+
+    @property
+    def weights(self) -> dict[int, float]:
+        return dict(self.db.execute("SELECT by_id, weight FROM senders WHERE weight IS NOT NULL"))
+
+    def set_mode(self, mode: str):
+        if mode not in POOL_MODES:
+            raise ValueError(f"unknown pool mode: {mode}")
+        with self._tx() as c:
+            c.execute("UPDATE meta SET v = ? WHERE k = 'mode'", (mode,))
+            c.execute("UPDATE meta SET v = 0.0 WHERE k = 'vclock'")
+            c.execute("UPDATE senders SET next_vt = 0")
+            # re-rank what's queued under the new mode, oldest first
+            for url, by_id, by_name in c.execute("SELECT url, by_id, by_name FROM links WHERE out = 0 "
+                                                 "ORDER BY seq").fetchall():
+                self._enqueue(url, by_id, by_name, mode, new=False)
+
+    def set_weight(self, by_id: int, weight: float):
+        with self._tx() as c:
+            c.execute("INSERT INTO senders(by_id, weight) VALUES (?, ?) "
+                      "ON CONFLICT(by_id) DO UPDATE SET weight = excluded.weight", (by_id, weight))
+
+    def queued(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM links WHERE out = 0").fetchone()[0]
+
+    def pool_items(self) -> list[LinkItem]:
+        rows = self.db.execute("SELECT url, by_id, by_name, seq FROM links WHERE out = 0 ORDER BY vt, seq")
+        return [LinkItem(u, contributor(b, n), seq) for u, b, n, seq in rows]
+
+    def backlog(self) -> list[tuple[int, str, int]]:
+        return list(self.db.execute(
+            "SELECT by_id, MAX(by_name), COUNT(*) AS n FROM links WHERE out = 0 GROUP BY by_id ORDER BY n DESC"))
+
+    def add_links(self, by_id: int, by_name: str, urls: list[str]) -> list[str]:
+        with self._tx():
+            mode = self.mode
+            added = [u for u in urls if self._enqueue(u, by_id, by_name, mode, new=True)]
+            if added:
+                self._bump("sender", by_id, "added", len(added), by_name)
+        return added
+
+    # ---- assignments ----
+    def _pending_row(self, user_id: int) -> PendingLink | None:
+        row = self.db.execute(f"SELECT {_PENDING_COLS} FROM pending WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None
+        return pending_from_dict(dict(zip(("url", "by_id", "by_name") + PENDING_TIME_FIELDS, row)))
+
+    def get(self, user_id: int) -> PendingLink | None:
+        return self._pending_row(user_id)
+
+    def pending_users(self) -> list[int]:
+        return [r[0] for r in self.db.execute("SELECT user_id FROM pending")]
+
+    def pending_count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+
+    def due(self, now: float) -> list[int]:
+        return [r[0] for r in self.db.execute("SELECT user_id FROM pending WHERE expiry_time <= ?", (now,))]
+
+    def take(self, user_id: int, make: MakePending) -> tuple[PendingLink | None, PendingLink | None]:
+        with self._tx() as c:
+            row = c.execute("SELECT url, by_id, by_name, vt, seq FROM links WHERE out = 0 "
+                            "ORDER BY vt, seq LIMIT 1").fetchone()
+            if row is None:
+                return None, None
+            url, by_id, by_name, vt, seq = row
+            c.execute("UPDATE links SET out = 1 WHERE url = ?", (url,))
+            if self.mode != "fifo":
+                self._set_meta("vclock", vt)
+            old = self._finish(user_id, "done", None)
+            pl = make(LinkItem(url, contributor(by_id, by_name), seq))
+            d = pending_to_dict(pl)
+            c.execute(f"INSERT INTO pending(user_id, {_PENDING_COLS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                      (user_id, d["url"], d["by_id"], d["by_name"], *(d[k] for k in PENDING_TIME_FIELDS)))
+            self._bump("user", user_id, "sent")
+        return pl, old
+
+    def _finish(self, user_id: int, op: str, expect: PendingLink | None) -> PendingLink | None:
+        pl = self._pending_row(user_id)
+        if pl is None or (expect is not None and not same_assignment(pl, expect)):
+            return None
+        self.db.execute("DELETE FROM pending WHERE user_id = ?", (user_id,))
+        if op in FINISH_RETURNS:
+            self._enqueue(pl.url, pl.by_id, pl.by_name, self.mode, new=False)
+        else:
+            self.db.execute("DELETE FROM links WHERE url = ?", (pl.url,))
+        field = FINISH_STAT_FIELDS.get(op)
+        if field:
+            self._bump("user", user_id, field)
+            self._bump("sender", pl.by_id, field, name=pl.by_name)
+        return pl
+
+    def finish(self, user_id: int, op: str, expect: PendingLink | None = None) -> PendingLink | None:
+        # compare-and-finish: of two workers racing on one assignment only one gets it back
+        with self._tx():
+            return self._finish(user_id, op, expect)
+
+    # ---- counters ----
+    def user_stats(self, user_id: int, day: str | None = None) -> dict[str, int]:
+        row = self.db.execute(f"SELECT {', '.join(USER_FIELDS)} FROM counters "
+                              "WHERE day = ? AND kind = 'user' AND id = ?", (day or today_str(), user_id)).fetchone()
+        return dict(zip(USER_FIELDS, row or (0,) * len(USER_FIELDS)))
+
+    def counters(self, day: str | None = None) -> DayCounters | None:
+        day = day or today_str()
+        dc = DayCounters(day)
+        rows = self.db.execute(f"SELECT kind, id, name, {', '.join(_COUNTER_FIELDS)} FROM counters WHERE day = ?",
+                               (day,)).fetchall()
+        for kind, id_, name, *vals in rows:
+            v = dict(zip(_COUNTER_FIELDS, vals))
+            if kind == "user":
+                for f in USER_FIELDS:
+                    dc.bump_user(id_, f, v[f])
+            else:
+                for f in SENDER_FIELDS:
+                    dc.bump_sender(id_, name, f, v[f])
+        if not rows and day != today_str():
+            return None
+        return dc
+
+    # ---- lifecycle ----
+    def compact_due(self) -> bool:
+        # no journal: every transition is committed in the DB
+        return False
+
+    def restore(self):
+        # nothing to rebuild: the DB is the state
+        pass
+
+    def close(self):
+        self.db.close()
+
+def open_backend(kind: str, data_dir: str, db_path: str = "", mode: str = "fifo",
+                 weights: dict[int, float] | None = None, keep_days: int = 7):
+    if kind == "memory":
+        return MemoryBackend(data_dir, mode, weights, keep_days)
+    if kind == "sqlite":
+        return SqliteBackend(db_path or os.path.join(data_dir, "state.sqlite3"), mode, weights)
+    raise ValueError(f"unknown state backend: {kind} ({'|'.join(BACKENDS)})")
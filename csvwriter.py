@@ -0,0 +1,157 @@
+import csv
+import os
+import threading
+import time
+
+from perf import metrics
+
+# =========================
+# Daily CSV writer (background thread)
+# rows memory me queue hote hain, thread batch me likhta hai
+# ek open file handle per day, midnight pe naya file
+# write fail (disk full, permissions) -> rows queue ke aage wapas, backoff ke saath retry
+# =========================
+RETRY_MIN_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+
+class DailyCsvWriter:
+    def __init__(self, data_dir: str, headers: list[str],
+                 flush_interval: float = 1.0, max_batch: int = 500):
+        self.data_dir = data_dir
+        self.headers = headers
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._rows: list[tuple[str, list]] = []
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stop = False
+        self._enqueued = 0
+        self._written = 0
+
+        self._day: str | None = None
+        self._f = None
+        self._w = None
+
+        self.flushes = 0
+        self.errors = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._rows)
+
+    def path_for(self, day: str) -> str:
+        return os.path.join(self.data_dir, f"{day}.csv")
+
+    def start(self):
+        if self._thread is None:
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="daily-csv-writer", daemon=True)
+            self._thread.start()
+
+    def put(self, day: str, row: list):
+        with self._cond:
+            self._rows.append((day, row))
+            self._enqueued += 1
+            if len(self._rows) >= self.max_batch:
+                self._cond.notify_all()
+        if self._thread is None:
+            self.start()
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        # block until everything queued so far is on disk (e.g. before /sheet)
+        with self._cond:
+            target = self._enqueued
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._close_file()
+
+    # ---- writer thread ----
+    def _run(self):
+        backoff = 0.0
+        while True:
+            with self._cond:
+                if not self._stop:
+                    if backoff:
+                        self._cond.wait(backoff)
+                    elif len(self._rows) < self.max_batch:
+                        self._cond.wait(self.flush_interval)
+                batch, self._rows = self._rows, []
+                stop = self._stop
+
+            failed = self._write(batch) if batch else []
+            if failed and stop:
+                # shutting down and the disk still refuses: nothing left to retry with
+                self.rows_dropped += len(failed)
+                metrics.inc("sheet_rows_dropped_total", len(failed))
+                print(f"❌ Daily CSV: {len(failed)} rows dropped at shutdown")
+                failed = []
+
+            with self._cond:
+                if failed:
+                    # failed rows go first again (sheet order), newer rows behind them
+                    self._rows[:0] = failed
+                    backoff = min(max(backoff * 2, RETRY_MIN_SECONDS), RETRY_MAX_SECONDS)
+                else:
+                    backoff = 0.0
+                self._written += len(batch) - len(failed)
+                self._cond.notify_all()
+                if stop and not self._rows:
+                    return
+
+    def _write(self, batch: list[tuple[str, list]]) -> list[tuple[str, list]]:
+        # -> rows not written (whole day groups; a group that failed midway may repeat a row on retry)
+        t = time.perf_counter()
+        done = 0
+        try:
+            while done < len(batch):
+                day = batch[done][0]
+                end = done
+                while end < len(batch) and batch[end][0] == day:
+                    end += 1
+                if day != self._day:
+                    self._open(day)
+                self._w.writerows(row for _, row in batch[done:end])
+                self._f.flush()
+                done = end
+            self.flushes += 1
+            return []
+        except Exception as e:
+            self.errors += 1
+            metrics.inc("sheet_write_errors_total")
+            print(f"❌ Daily CSV write failed, {len(batch) - done} rows kept for retry: {e}")
+            self._close_file()
+            return batch[done:]
+        finally:
+            self.rows_written += done
+            metrics.observe("disk_seconds", time.perf_counter() - t, op="daily_csv_batch")
+
+    def _open(self, day: str):
+        self._close_file()
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = self.path_for(day)
+        self._f = open(path, "a", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f)
+        if self._f.tell() == 0:
+            self._w.writerow(self.headers)
+        self._day = day
+
+    def _close_file(self):
+        if self._f is not None:
+            try:
+                self._f.close()
+            except Exception:
+                pass
+        self._f = None
+        self._w = None
+        self._day = None
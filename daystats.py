@@ -0,0 +1,166 @@
+import csv
+import sys
+from array import array
+from datetime import date
+from typing import Any, Callable
+
+# =========================
+# Day-wise counters
+# har din ke apne employee + contributor counters; midnight pe naya din,
+# last N din memory me, purane din daily CSV se rebuild
+# =========================
+USER_FIELDS = ("sent", "copied", "cancelled", "expired")
+SENDER_FIELDS = ("added", "copied", "cancelled", "expired")
+
+_NU, _NS = len(USER_FIELDS), len(SENDER_FIELDS)
+_USER_POS = {f: i for i, f in enumerate(USER_FIELDS)}
+_SENDER_POS = {f: i for i, f in enumerate(SENDER_FIELDS)}
+_USER_ZEROS = array("i", [0] * _NU)
+_SENDER_ZEROS = array("i", [0] * _NS)
+
+# daily CSV status -> counter field
+CSV_STATUS_FIELDS = {"pending": "sent", "done": "copied", "cancelled": "cancelled", "expired": "expired"}
+
+def today_str() -> str:
+    return date.today().strftime("%Y-%m-%d")
+
+class DayCounters:
+    # one flat array('i') row per employee / contributor + id -> row index
+    # (a dict of 4 ints per user costs ~4x more at thousands of users)
+    __slots__ = ("day", "_uidx", "_u", "_sidx", "_s", "_snames")
+
+    def __init__(self, day: str):
+        self.day = day
+        self._uidx: dict[int, int] = {}
+        self._u = array("i")
+        self._sidx: dict[int, int] = {}
+        self._s = array("i")
+        self._snames: list[str] = []
+
+    # ---- employees ----
+    def _user_row(self, user_id: int) -> int:
+        i = self._uidx.get(user_id)
+        if i is None:
+            i = self._uidx[user_id] = len(self._uidx)
+            self._u.extend(_USER_ZEROS)
+        return i * _NU
+
+    def bump_user(self, user_id: int, field: str, n: int = 1):
+        self._u[self._user_row(user_id) + _USER_POS[field]] += n
+
+    def user(self, user_id: int) -> dict[str, int]:
+        # {"sent", "copied", "cancelled", "expired"} (a copy)
+        r = self._user_row(user_id)
+        return dict(zip(USER_FIELDS, self._u[r:r + _NU]))
+
+    def get_user(self, user_id: int) -> dict[str, int] | None:
+        return self.user(user_id) if user_id in self._uidx else None
+
+    def user_ids(self) -> list[int]:
+        return list(self._uidx)
+
+    # ---- contributors ----
+    def _sender_row(self, uid: int, name: str) -> int:
+        i = self._sidx.get(uid)
+        if i is None:
+            i = self._sidx[uid] = len(self._sidx)
+            self._s.extend(_SENDER_ZEROS)
+            self._snames.append(sys.intern(name))
+        elif name and name != self._snames[i]:
+            self._snames[i] = sys.intern(name)
+        return i
+
+    def bump_sender(self, uid: int, name: str, field: str, n: int = 1):
+        self._s[self._sender_row(uid, name) * _NS + _SENDER_POS[field]] += n
+
+    def sender(self, uid: int, name: str = "") -> dict[str, Any]:
+        # {"name", "added", "copied", "cancelled", "expired"} (a copy)
+        i = self._sender_row(uid, name)
+        return {"name": self._snames[i], **dict(zip(SENDER_FIELDS, self._s[i * _NS:(i + 1) * _NS]))}
+
+    def get_sender(self, uid: int) -> dict[str, Any] | None:
+        return self.sender(uid) if uid in self._sidx else None
+
+    def sender_ids(self) -> list[int]:
+        return list(self._sidx)
+
+    # ---- snapshot (same JSON shape as the old dict-of-dicts) ----
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "users": {str(k): self.user(k) for k in self._uidx},
+            "senders": {str(k): self.sender(k) for k in self._sidx},
+        }
+
+    @classmethod
+    def from_dict(cls, day: str, d: dict[str, Any]) -> "DayCounters":
+        dc = cls(day)
+        for k, v in d.get("users", {}).items():
+            for f in USER_FIELDS:
+                dc.bump_user(int(k), f, int(v.get(f, 0)))
+        for k, v in d.get("senders", {}).items():
+            for f in SENDER_FIELDS:
+                dc.bump_sender(int(k), str(v.get("name", "")), f, int(v.get(f, 0)))
+        return dc
+
+class DayStats:
+    def __init__(self, keep_days: int = 7, today_fn: Callable[[], str] = today_str):
+        self.keep_days = keep_days
+        self.today_fn = today_fn
+        self.days: dict[str, DayCounters] = {}
+        self._today: DayCounters | None = None
+
+    def today(self) -> DayCounters:
+        day = self.today_fn()
+        cur = self._today
+        if cur is None or cur.day != day:
+            # midnight rollover
+            cur = self._today = self.day(day)
+        return cur
+
+    def day(self, day: str) -> DayCounters:
+        dc = self.days.get(day)
+        if dc is None:
+            dc = self.days[day] = DayCounters(day)
+            self._trim()
+        return dc
+
+    def get(self, day: str) -> DayCounters | None:
+        return self.days.get(day)
+
+    def _trim(self):
+        if len(self.days) <= self.keep_days:
+            return
+        for old in sorted(self.days)[:-self.keep_days]:
+            del self.days[old]
+        if self._today is not None and self._today.day not in self.days:
+            self._today = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {day: dc.to_dict() for day, dc in self.days.items()}
+
+    def load(self, d: dict[str, Any]):
+        self.days = {day: DayCounters.from_dict(day, v) for day, v in d.items()}
+        self._today = None
+        self._trim()
+
+def counters_from_csv(path: str, day: str) -> DayCounters:
+    # rebuild one day's counters from its sheet (contributor "added" is not in the sheet)
+    dc = DayCounters(day)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                field = CSV_STATUS_FIELDS.get(row.get("status", ""))
+                if not field:
+                    continue
+                try:
+                    dc.bump_user(int(row["employee_id"]), field)
+                except (KeyError, ValueError):
+                    pass
+                if field != "sent" and row.get("by_id"):
+                    try:
+                        dc.bump_sender(int(row["by_id"]), row.get("by_name", ""), field)
+                    except ValueError:
+                        pass
+    except FileNotFoundError:
+        pass
+    return dc
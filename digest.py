@@ -0,0 +1,90 @@
+import time
+from collections import Counter
+
+from outbox import Outbox, PRIO_OWNER
+
+# =========================
+# Notification digests (owner / contributors)
+# har event ka alag message bhejne ke bajaye N sec me ek summary
+# =========================
+EVENT_LABELS = {
+    "assign": "✅ Assigned",
+    "copy": "📋 Copied",
+    "cancel": "🔁 Cancelled",
+    "expire": "♻️ Expired",
+    "remove": "🗑 Removed",
+}
+
+MAX_MESSAGE_CHARS = 4000
+
+class DigestConfig:
+    __slots__ = ("interval", "instant")
+
+    def __init__(self, interval: int = 0, instant: set[str] | None = None):
+        self.interval = interval            # 0 = har event turant
+        self.instant = instant or set()     # ye event types hamesha turant
+
+class DigestHub:
+    def __init__(self, outbox: Outbox, default_interval: int = 0):
+        self.outbox = outbox
+        self.default = DigestConfig(default_interval)
+        self.configs: dict[int, DigestConfig] = {}
+        self._lines: dict[int, list[str]] = {}
+        self._counts: dict[int, Counter] = {}
+        self._priority: dict[int, int] = {}
+        self._last_flush: dict[int, float] = {}
+        self.coalesced = 0
+
+    def config_for(self, chat_id: int) -> DigestConfig:
+        return self.configs.get(chat_id, self.default)
+
+    def configure(self, chat_id: int, interval: int, instant: set[str] | None = None):
+        self.configs[chat_id] = DigestConfig(interval, instant)
+        if interval <= 0:
+            self._flush_one(chat_id)
+
+    def notify(self, chat_id: int, kind: str, text: str, priority: int = PRIO_OWNER):
+        cfg = self.config_for(chat_id)
+        if cfg.interval <= 0 or kind in cfg.instant:
+            self.outbox.post(chat_id, text, priority=priority)
+            return
+
+        if chat_id not in self._lines:
+            self._lines[chat_id] = []
+            self._counts[chat_id] = Counter()
+            self._last_flush.setdefault(chat_id, time.monotonic())
+        self._lines[chat_id].append(text.replace("\n", " | "))
+        self._counts[chat_id][kind] += 1
+        self._priority[chat_id] = min(priority, self._priority.get(chat_id, priority))
+        self.coalesced += 1
+
+    @property
+    def pending(self) -> int:
+        return sum(len(v) for v in self._lines.values())
+
+    def flush_due(self, force: bool = False):
+        now = time.monotonic()
+        for chat_id in list(self._lines):
+            cfg = self.config_for(chat_id)
+            if force or now - self._last_flush.get(chat_id, 0.0) >= cfg.interval:
+                self._flush_one(chat_id)
+
+    def _flush_one(self, chat_id: int):
+        lines = self._lines.pop(chat_id, None)
+        counts = self._counts.pop(chat_id, None)
+        priority = self._priority.pop(chat_id, PRIO_OWNER)
+        self._last_flush[chat_id] = time.monotonic()
+        if not lines:
+            return
+
+        head = " | ".join(f"{EVENT_LABELS.get(k, k)}: {n}" for k, n in counts.items())
+        text = f"📬 Digest ({len(lines)} events)\n{head}\n"
+        shown = 0
+        for ln in lines:
+            if len(text) + len(ln) + 40 > MAX_MESSAGE_CHARS:
+                break
+            text += f"\n• {ln}"
+            shown += 1
+        if shown < len(lines):
+            text += f"\n… +{len(lines) - shown} more"
+        self.outbox.post(chat_id, text, priority=priority)
@@ -0,0 +1,200 @@
+import csv
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+
+from perf import metrics
+from storage import atomic_open
+
+# =========================
+# Done-URL history index
+# jo link kabhi "done" (copied) hua, woh dobara pool me nahi jaana chahiye
+# scalable Bloom filter: ~2 bytes/URL at 0.1% false positives, O(k) lookup, koi URL store nahi hota
+# daily sheets (data/YYYY-MM-DD.csv) se incrementally banta hai: har file ka byte offset yaad rehta hai
+# file format: 1 JSON header line + layers ke raw bits (atomic replace)
+# =========================
+SHEET_RE = re.compile(r"\d{4}-\d{2}-\d{2}\.csv")
+DONE_STATUS = "done"
+
+class BloomLayer:
+    __slots__ = ("capacity", "fp", "m", "k", "count", "bits")
+
+    def __init__(self, capacity: int, fp: float, count: int = 0):
+        self.capacity = capacity
+        self.fp = fp
+        self.m = max(64, math.ceil(-capacity * math.log(fp) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.count = count
+        self.bits = bytearray((self.m + 7) // 8)
+
+    # double hashing: bit i = (h1 + i * h2) mod m
+    def __contains__(self, h: tuple[int, int]) -> bool:
+        h1, h2 = h
+        m, bits = self.m, self.bits
+        for i in range(self.k):
+            p = (h1 + i * h2) % m
+            if not bits[p >> 3] >> (p & 7) & 1:
+                return False        # most new URLs stop at the first bit or two
+        return True
+
+    def add(self, h: tuple[int, int]):
+        h1, h2 = h
+        m, bits = self.m, self.bits
+        new = False
+        for i in range(self.k):
+            p = (h1 + i * h2) % m
+            b = 1 << (p & 7)
+            if not bits[p >> 3] & b:
+                bits[p >> 3] |= b
+                new = True
+        if new:
+            self.count += 1
+
+def _hash(url: str) -> tuple[int, int]:
+    d = hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+
+class DoneIndex:
+    def __init__(self, path: str, capacity: int = 1_000_000, fp: float = 0.001):
+        self.path = path
+        self.capacity = capacity
+        self.fp = fp
+        self.layers: list[BloomLayer] = []
+        self.offsets: dict[str, int] = {}     # sheet file name -> bytes already indexed
+        self._lock = threading.Lock()         # add() from the loop, sync() from a storage thread
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return sum(l.count for l in self.layers)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(l.bits) for l in self.layers)
+
+    def __contains__(self, url: str) -> bool:
+        h = _hash(url)
+        for l in self.layers:
+            if h in l:
+                return True
+        return False
+
+    def add(self, url: str):
+        h = _hash(url)
+        with self._lock:
+            # already in a full layer -> nothing to do (last layer: add() only sets missing bits)
+            for l in self.layers[:-1]:
+                if h in l:
+                    return
+            last = self.layers[-1] if self.layers else None
+            if last is None or last.count >= last.capacity:
+                # layer n: capacity * 2^n, fp / 2^(n+1) -> overall false positives stay under fp
+                n = len(self.layers)
+                last = BloomLayer(self.capacity << n, self.fp / 2 ** (n + 1))
+                self.layers.append(last)
+            last.add(h)
+            self._dirty = True
+
+    def filter(self, urls: list[str]) -> tuple[list[str], int]:
+        # (not done before, rejected count)
+        fresh = [u for u in urls if u not in self]
+        return fresh, len(urls) - len(fresh)
+
+    # ---- persistence ----
+    def load(self) -> bool:
+        try:
+            with open(self.path, "rb") as f:
+                head = json.loads(f.readline())
+                layers = []
+                for l in head["layers"]:
+                    layer = BloomLayer(l["capacity"], l["fp"], l["count"])
+                    layer.bits = bytearray(f.read(len(layer.bits)))
+                    if layer.m != l["m"] or len(layer.bits) != (layer.m + 7) // 8:
+                        raise ValueError("layer size mismatch")
+                    layers.append(layer)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Done index unreadable ({e}), rebuilding from sheets")
+            return False
+        with self._lock:
+            self.layers = layers
+            self.offsets = {k: int(v) for k, v in head.get("offsets", {}).items()}
+            self._dirty = False
+        return True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            head = {
+                "layers": [{"capacity": l.capacity, "fp": l.fp, "m": l.m, "count": l.count}
+                           for l in self.layers],
+                "offsets": dict(self.offsets),
+            }
+            blobs = [bytes(l.bits) for l in self.layers]
+            self._dirty = False
+        t = time.perf_counter()
+        try:
+            with atomic_open(self.path, "wb", suffix=".bloom") as f:
+                f.write(json.dumps(head).encode("utf-8") + b"\n")
+                for b in blobs:
+                    f.write(b)
+        except:
+            self._dirty = True
+            raise
+        metrics.observe("disk_seconds", time.perf_counter() - t, op="done_index_save")
+
+    # ---- incremental build from daily sheets ----
+    def sync(self, data_dir: str) -> int:
+        # new "done" rows since the last sync (all workers' rows, same files) -> index; then save
+        added = 0
+        try:
+            names = sorted(n for n in os.listdir(data_dir) if SHEET_RE.fullmatch(n))
+        except FileNotFoundError:
+            names = []
+        for name in names:
+            added += self._index_sheet(data_dir, name)
+        self.save()
+        return added
+
+    def _index_sheet(self, data_dir: str, name: str) -> int:
+        path = os.path.join(data_dir, name)
+        t = time.perf_counter()
+        start = self.offsets.get(name, 0)
+        try:
+            with open(path, "rb") as f:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    return 0
+                size = os.fstat(f.fileno()).st_size
+                if start > size:
+                    start = 0       # sheet was rewritten -> from the top (re-adding is harmless)
+                if start < len(header):
+                    start = len(header)
+                f.seek(start)
+                chunk = f.read()
+        except FileNotFoundError:
+            return 0
+        # only complete lines; a row being written right now is picked up next time
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        cols = next(csv.reader([header.decode("utf-8-sig")]), [])
+        try:
+            i_link, i_status = cols.index("link"), cols.index("status")
+        except ValueError:
+            return 0
+        before = len(self)
+        for row in csv.reader(chunk[:end].decode("utf-8", errors="replace").splitlines()):
+            if len(row) > max(i_link, i_status) and row[i_status] == DONE_STATUS and row[i_link]:
+                self.add(row[i_link])
+        with self._lock:
+            if self.offsets.get(name) != start + end:
+                self.offsets[name] = start + end
+                self._dirty = True
+        metrics.observe("disk_seconds", time.perf_counter() - t, op="done_index_sync")
+        return len(self) - before
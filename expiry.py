@@ -0,0 +1,118 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Hashable
+
+# =========================
+# Expiry scheduler
+# ek min-heap (deadline, assignment id, key) + ek hi wake-up timer
+# cancel = live map se hatao (heap entry lazily skip hoti hai)
+# har due batch apna task: ek slow batch (busy user lock, outbox pause) agli deadlines ko nahi rokta
+# =========================
+BATCH_SLACK_SECONDS = 0.05   # itne andar due deadlines ek saath process
+
+class ExpiryScheduler:
+    def __init__(self, on_expire: Callable[[list[Hashable]], Awaitable[None]],
+                 clock: Callable[[], float] = time.time):
+        self.on_expire = on_expire
+        self.clock = clock
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._live: dict[Hashable, int] = {}       # key -> assignment id
+        self._ids = itertools.count(1)
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._batches: set[asyncio.Task] = set()
+        self.fired = 0
+        self.cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._live
+
+    def schedule(self, key: Hashable, deadline: float) -> int:
+        # one live deadline per key; re-scheduling replaces the old one
+        aid = next(self._ids)
+        if key in self._live:
+            self.cancelled += 1
+        self._live[key] = aid
+        heapq.heappush(self._heap, (deadline, aid, key))
+        if self._heap[0][1] == aid:
+            self._wake.set()
+        return aid
+
+    def cancel(self, key: Hashable) -> bool:
+        if self._live.pop(key, None) is None:
+            return False
+        self.cancelled += 1
+        # keep the heap from filling up with dead entries
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._live):
+            self._compact()
+        return True
+
+    def _compact(self):
+        self._heap = [e for e in self._heap if self._live.get(e[2]) == e[1]]
+        heapq.heapify(self._heap)
+
+    def pop_due(self, now: float) -> list[Hashable]:
+        due: list[Hashable] = []
+        limit = now + BATCH_SLACK_SECONDS
+        while self._heap and self._heap[0][0] <= limit:
+            _, aid, key = heapq.heappop(self._heap)
+            if self._live.get(key) != aid:
+                continue
+            del self._live[key]
+            due.append(key)
+        return due
+
+    def next_deadline(self) -> float | None:
+        while self._heap and self._live.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    # ---- runner ----
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # batches already fired run to completion
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+
+    @property
+    def running_batches(self) -> int:
+        return len(self._batches)
+
+    async def _fire(self, due: list[Hashable]):
+        try:
+            await self.on_expire(due)
+        except Exception as e:
+            print(f"❌ Expiry batch failed: {e}")
+
+    async def _run(self):
+        while True:
+            due = self.pop_due(self.clock())
+            if due:
+                self.fired += len(due)
+                task = asyncio.create_task(self._fire(due))
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+                continue
+
+            nxt = self.next_deadline()
+            timeout = None if nxt is None else max(0.0, nxt - self.clock())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
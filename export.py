@@ -0,0 +1,104 @@
+import csv
+import gzip
+import io
+import os
+from datetime import date, timedelta
+
+# =========================
+# Sheet export (date range)
+# daily CSVs ko ek-ek row stream karke filter + merge, gzip parts me likho
+# (poora data memory me kabhi nahi aata)
+# =========================
+PART_LIMIT_BYTES = 45 * 1024 * 1024      # Telegram 50 MB upload limit se thoda neeche
+MAX_RANGE_DAYS = 366
+
+FILTER_KEYS = {
+    "employee": ("employee_name", "employee_id"),
+    "by": ("by_name", "by_id"),
+    "status": ("status",),
+}
+FILTER_ALIASES = {"emp": "employee", "contributor": "by", "sender": "by"}
+
+def parse_filters(args: list[str]) -> dict[str, str]:
+    # ["employee=Irfan", "status=done"] -> {"employee": "irfan", "status": "done"}
+    filters: dict[str, str] = {}
+    for a in args:
+        if "=" not in a:
+            raise ValueError(f"bad filter: {a}")
+        k, v = a.split("=", 1)
+        k = FILTER_ALIASES.get(k.strip().lower(), k.strip().lower())
+        if k not in FILTER_KEYS:
+            raise ValueError(f"unknown filter: {k}")
+        filters[k] = v.strip().lower()
+    return filters
+
+def row_matches(row: dict[str, str], filters: dict[str, str]) -> bool:
+    for k, want in filters.items():
+        if not any((row.get(col) or "").strip().lower() == want for col in FILTER_KEYS[k]):
+            return False
+    return True
+
+def days_between(start: date, end: date) -> list[date]:
+    if end < start:
+        start, end = end, start
+    n = (end - start).days + 1
+    if n > MAX_RANGE_DAYS:
+        raise ValueError(f"range too long (max {MAX_RANGE_DAYS} days)")
+    return [start + timedelta(days=i) for i in range(n)]
+
+class _PartWriter:
+    def __init__(self, out_dir: str, stem: str, headers: list[str], limit: int):
+        self.out_dir = out_dir
+        self.stem = stem
+        self.headers = headers
+        self.limit = limit
+        self.parts: list[tuple[str, int]] = []   # (path, rows)
+        self._raw = None
+        self._text = None
+        self._w = None
+        self._rows = 0
+
+    def _open(self):
+        path = os.path.join(self.out_dir, f"{self.stem}_part{len(self.parts) + 1}.csv.gz")
+        self._raw = open(path, "wb")
+        gz = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        self._text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        self._w = csv.writer(self._text)
+        self._w.writerow(self.headers)
+        self.parts.append((path, 0))
+        self._rows = 0
+
+    def write(self, row: list[str]):
+        if self._w is None:
+            self._open()
+        self._w.writerow(row)
+        self._rows += 1
+        # compressed bytes so far (gzip buffers a little, hence the margin in PART_LIMIT_BYTES)
+        if self._raw.tell() >= self.limit:
+            self.close_part()
+
+    def close_part(self):
+        if self._w is None:
+            return
+        self._text.close()      # closes the gzip stream too
+        self._raw.close()
+        path, _ = self.parts[-1]
+        self.parts[-1] = (path, self._rows)
+        self._raw = self._text = self._w = None
+
+def export_range(data_dir: str, start: date, end: date, filters: dict[str, str],
+                 out_dir: str, headers: list[str], limit: int = PART_LIMIT_BYTES) -> list[tuple[str, int]]:
+    days = days_between(start, end)
+    stem = f"sheet_{days[0]:%d-%m-%y}_{days[-1]:%d-%m-%y}"
+    out = _PartWriter(out_dir, stem, headers, limit)
+    for d in days:
+        path = os.path.join(data_dir, f"{d:%Y-%m-%d}.csv")
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                if filters and not row_matches(row, filters):
+                    continue
+                out.write([row.get(h, "") for h in headers])
+    out.close_part()
+    return out.parts
@@ -0,0 +1,65 @@
+import csv
+import io
+import re
+from typing import Iterable
+
+# =========================
+# Bulk link ingestion
+# multi-line paste / .txt / .csv -> validated, de-duplicated URL list
+# (pool check + journal main.py me hota hai, event loop pe)
+# =========================
+MAX_URL_LEN = 2048
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024     # Telegram bot download limit
+
+class IngestResult:
+    __slots__ = ("urls", "duplicates", "invalid", "candidates")
+
+    def __init__(self):
+        self.urls: list[str] = []
+        self.duplicates = 0
+        self.invalid = 0
+        self.candidates = 0     # tokens starting with http:// or https:// (valid or not)
+
+# scheme + non-empty host, no whitespace
+_URL_RE = re.compile(r"https?://[^\s/?#]+[^\s]*", re.IGNORECASE)
+
+def clean_url(token: str) -> str | None:
+    token = token.strip().strip("\"'<>")
+    if len(token) > MAX_URL_LEN or not _URL_RE.fullmatch(token):
+        return None
+    return token
+
+def parse_rows(rows: Iterable[list[str]], strict_lines: bool = True) -> IngestResult:
+    # strict_lines: non-empty row with no URL counts as invalid (text paste / .txt)
+    res = IngestResult()
+    seen: set[str] = set()
+    for row in rows:
+        found = False
+        for tok in row:
+            if "http" not in tok.lower():
+                continue
+            found = True
+            if tok.strip().strip("\"'<>").lower().startswith(("http://", "https://")):
+                res.candidates += 1
+            url = clean_url(tok)
+            if url is None:
+                res.invalid += 1
+            elif url in seen:
+                res.duplicates += 1
+            else:
+                seen.add(url)
+                res.urls.append(url)
+        if not found and strict_lines and any(t.strip() for t in row):
+            res.invalid += 1
+    return res
+
+def parse_text(text: str) -> IngestResult:
+    return parse_rows(line.split() for line in text.splitlines())
+
+def parse_upload(data: bytes, filename: str) -> IngestResult:
+    # line by line over the buffer, no intermediate list of lines
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", errors="replace", newline="")
+    if filename.lower().endswith(".csv"):
+        # header / other columns are fine, only URL-looking cells matter
+        return parse_rows(csv.reader(stream), strict_lines=False)
+    return parse_rows(line.split() for line in stream)
@@ -0,0 +1,33 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+# =========================
+# Per-key async locks (concurrent updates)
+# ek employee ke saare state transitions (button, expiry, wait-list) ek-ek karke;
+# alag employees parallel chalte hain. Lock tabhi tak rehta hai jab tak koi use kar raha ho.
+# =========================
+class KeyedLocks:
+    def __init__(self):
+        self._locks: dict[Any, tuple[asyncio.Lock, int]] = {}   # key -> (lock, holders+waiters)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def locked(self, key: Any) -> bool:
+        ent = self._locks.get(key)
+        return ent is not None and ent[0].locked()
+
+    @asynccontextmanager
+    async def hold(self, key: Any) -> AsyncIterator[None]:
+        lock, n = self._locks.get(key) or (asyncio.Lock(), 0)
+        self._locks[key] = (lock, n + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, n = self._locks[key]
+            if n <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, n - 1)
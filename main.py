@@ -1,10 +1,14 @@
+import asyncio
 import csv
 import os
-from dataclasses import dataclass
-from datetime import datetime, timedelta, date
-from typing import List, Dict, Any
+import shutil
+import tempfile
+import time
+from datetime import datetime, date
+from typing import Any
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -14,7 +18,24 @@ from telegram.ext import (
     filters,
 )
 
+import config
 from config import BOT_TOKEN, OWNER_ID, EMPLOYEES_CSV
+from csvwriter import DailyCsvWriter
+from pool import LinkItem, WaitList, POOL_MODES
+from roster import RosterCache
+from storage import run_io, write_csv_atomic, write_text_atomic, read_bytes, shutdown_io
+from backend import BackendBusy, PendingLink, open_backend, same_assignment
+from outbox import Outbox, PRIO_EMPLOYEE, PRIO_OWNER, PRIO_SENDER, PRIO_LIVE
+from digest import DigestHub, EVENT_LABELS
+from expiry import ExpiryScheduler
+from daystats import DayCounters, USER_FIELDS, counters_from_csv
+from export import export_range, parse_filters, days_between
+from analytics import summarize_range, format_report
+from ingest import parse_text, parse_upload, MAX_UPLOAD_BYTES
+from doneindex import DoneIndex
+from locks import KeyedLocks
+from perf import metrics, process_io, start_metrics_server, TimedRequest
+from profiler import StackSampler, collapsed_filename
 
 # =========================
 # Settings
@@ -25,18 +46,102 @@ ADMINS_CSV = os.path.join(DATA_DIR, "admins.csv")
 MAX_LINKS_PER_USER = 75
 LINK_EXPIRE_SECONDS = 5 * 60
 
+DIGEST_DEFAULT_SECONDS = 0            # 0 = owner/admin notifications turant (no digest)
+DIGEST_TICK_SECONDS = 5
+DIGEST_CSV = os.path.join(DATA_DIR, "digest.csv")
+
+POOL_MODE = "fifo"                    # fifo | rr (round-robin per contributor) | wfq (weighted)
+                                      # sirf fresh state ke liye; /poolmode ka change saved rehta hai aur isse override karta hai
+POOL_WEIGHTS: dict[int, float] = {}   # wfq: {admin_id: weight}, default 1
+
+LIVE_PANEL_SECONDS = 0                # 0 = off; e.g. 15 -> active panels ka countdown har 15s update
+LIVE_EDITS_PER_SECOND = 10            # global budget for live panel edits
+LIVE_MAX_OUTBOX_QUEUE = 200           # outbox itna bhara ho to live tick skip
+
+DAY_STATS_KEEP_DAYS = 7               # itne din ke counters memory me
+ANALYTICS_DIR = os.path.join(DATA_DIR, "analytics")   # per-day summary cache
+ANALYTICS_TOP = 10                    # report me top N employees / contributors
+
 REQUEST_COOLDOWN_SECONDS = 60          # link aane ke 1 min baad REQUEST allow
 CANCEL_ACTIVE_SECONDS = 5 * 60         # 5 min: Cancel + Expire(Remove) buttons
 
+CONCURRENT_UPDATES = 64                # updates handled in parallel (1 = one at a time)
+
+# Webhook mode (config.py me WEBHOOK_URL set ho to polling ki jagah webhook)
+# WEBHOOK_URL = public https base, e.g. "https://bot.example.com" (reverse proxy -> listen:port)
+WEBHOOK_URL = getattr(config, "WEBHOOK_URL", "")
+WEBHOOK_LISTEN = getattr(config, "WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = getattr(config, "WEBHOOK_PORT", 8443)
+WEBHOOK_PATH = getattr(config, "WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = getattr(config, "WEBHOOK_SECRET", "")   # X-Telegram-Bot-Api-Secret-Token
+
+# State backend: "memory" (ek process) | "sqlite" (kai webhook workers ek DB share karte hain)
+STATE_BACKEND = getattr(config, "STATE_BACKEND", "memory")
+STATE_DB = getattr(config, "STATE_DB", os.path.join(DATA_DIR, "state.sqlite3"))
+EXPIRY_SWEEP_SECONDS = 5              # shared backend: doosre workers ke overdue links bhi expire
+STATE_BUSY_RETRY_SECONDS = 10         # shared backend: DB busy ho to transition itni der tak retry (loop free)
+JOURNAL_COMPACT_CHECK_SECONDS = 30    # memory backend: journal bada ho gaya to snapshot (background me)
+
+# Instrumentation (/perf): Prometheus text file har PERF_EXPORT_SECONDS, optional local HTTP /metrics
+PERF_PROM_FILE = getattr(config, "PERF_PROM_FILE", os.path.join(DATA_DIR, "metrics.prom"))   # "" = off
+PERF_EXPORT_SECONDS = 15
+PERF_HTTP_LISTEN = getattr(config, "PERF_HTTP_LISTEN", "127.0.0.1")
+PERF_HTTP_PORT = getattr(config, "PERF_HTTP_PORT", 0)                 # 0 = off; e.g. 9108
+PERF_TOP = 12                         # /perf me har table ki rows
+PROFILE_INTERVAL = 0.005              # /profile: stack sample har 5ms
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 600
+PROFILE_TOP = 25
+
+# Done-URL history: jo link kabhi copy (done) ho chuka, woh dobara pool me nahi jaata
+DONE_INDEX_FILE = os.path.join(DATA_DIR, "done_urls.bloom")
+DONE_INDEX_CAPACITY = 1_000_000       # first Bloom layer; bharne pe 2x ka naya layer
+DONE_INDEX_FP = 0.001                 # false positive rate (naya link galti se "done" maana jaaye)
+DONE_INDEX_SYNC_SECONDS = 5 * 60      # sheets se naye done rows (doosre workers ke bhi) + save
+
 # =========================
-# Global Link Pool (FIFO) with metadata
-# each item: {"url": str, "by_id": int, "by_name": str}
+# Link pool + assignments + per-day counters (see backend.py)
+# pool items: LinkItem(url, Contributor); assignment deadlines are epoch seconds (now_ts())
 # =========================
-link_pool: List[Dict[str, Any]] = []
-
-# Per-sender contribution stats (owner/admin)
-# sender_stats[user_id] = {"name": str, "added": int, "copied": int, "cancelled": int, "expired": int}
-sender_stats: Dict[int, Dict[str, Any]] = {}
+state = open_backend(STATE_BACKEND, DATA_DIR, STATE_DB, POOL_MODE, POOL_WEIGHTS, DAY_STATS_KEEP_DAYS)
+
+# every URL that ever reached "done" (built from the daily sheets, see doneindex.py)
+done_index = DoneIndex(DONE_INDEX_FILE, DONE_INDEX_CAPACITY, DONE_INDEX_FP)
+
+async def transition(fn, *args, **kwargs):
+    # backend transition; shared DB write lock busy -> back off here (asyncio.sleep), not inside sqlite
+    delay = 0.01
+    deadline = time.monotonic() + STATE_BUSY_RETRY_SECONDS
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except BackendBusy:
+            if time.monotonic() + delay > deadline:
+                raise
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+# employees who pressed REQUEST while the pool was empty (served in order)
+waitlist = WaitList()
+
+# all outgoing bot messages (rate limited, retried); only callback answers go direct
+outbox = Outbox()
+# owner/contributor event notifications, optionally coalesced per recipient
+digests = DigestHub(outbox, DIGEST_DEFAULT_SECONDS)
+
+async def reply(update: Update, text: str, **kwargs) -> Any:
+    # command replies: same chat, via the outbox
+    return await outbox.send(update.message.chat_id, text, **kwargs)
+
+async def edit_pressed(query, text: str, **kwargs) -> Any:
+    # edit the message whose button was pressed (owner approvals)
+    return await outbox.submit("edit_message_text", query.message.chat_id,
+                               message_id=query.message.message_id, text=text, **kwargs)
+
+# one employee's transitions run one at a time (callbacks, expiry, wait-list, remove)
+user_locks = KeyedLocks()
+# employees/admins CSV read-modify-write
+roster_lock = asyncio.Lock()
 
 # =========================
 # Helpers
@@ -49,6 +154,9 @@ def ensure_dir(path: str):
 def now_str() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+def now_ts() -> float:
+    return datetime.now().timestamp()
+
 def sheet_date_str(d: date | None = None) -> str:
     if d is None:
         d = date.today()
@@ -60,23 +168,16 @@ def parse_ddmmyy(s: str) -> date:
 def sender_display(user_id: int, fallback_name: str = "") -> str:
     if user_id == OWNER_ID:
         return "OWNER"
-    adm = load_admins()
-    if user_id in adm:
-        return f"ADMIN {adm[user_id]}"
+    if user_id in admins_cache:
+        return f"ADMIN {admins_cache.name(user_id)}"
     return fallback_name or "UNKNOWN"
 
-def get_sender_stats(uid: int, name: str):
-    if uid not in sender_stats:
-        sender_stats[uid] = {"name": name, "added": 0, "copied": 0, "cancelled": 0, "expired": 0}
-    else:
-        sender_stats[uid]["name"] = name
-    return sender_stats[uid]
+def notify_owner(kind: str, text: str):
+    digests.notify(OWNER_ID, kind, text, priority=PRIO_OWNER)
 
-async def notify_sender(context: ContextTypes.DEFAULT_TYPE, sender_id: int, text: str):
-    try:
-        await context.bot.send_message(sender_id, text)
-    except:
-        pass
+def notify_sender(kind: str, sender_id: int, text: str):
+    # lowest priority; failures are counted by the outbox (no more silent drops)
+    digests.notify(sender_id, kind, text, priority=PRIO_SENDER)
 
 # =========================
 # Daily CSV
@@ -101,21 +202,22 @@ def ensure_daily_csv(d: date | None = None) -> str:
             w.writerow(DAILY_HEADERS)
     return path
 
+# rows are queued and written by a background thread (no disk I/O in handlers)
+daily_writer = DailyCsvWriter(DATA_DIR, DAILY_HEADERS)
+
 def append_daily_row(employee_name: str, employee_id: int, link: str, status: str,
                      sent_time: str = "", expiry_time: str = "",
                      done_time: str = "", cancelled_time: str = "",
                      expired_time: str = "", note: str = "",
                      by_name: str = "", by_id: int | str = ""):
-    path = ensure_daily_csv()
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow([
-            sheet_date_str(), employee_name, employee_id,
-            link, status,
-            sent_time, expiry_time, done_time, cancelled_time,
-            expired_time, note,
-            by_name, by_id
-        ])
+    day = sheet_date_str()
+    daily_writer.put(day, [
+        day, employee_name, employee_id,
+        link, status,
+        sent_time, expiry_time, done_time, cancelled_time,
+        expired_time, note,
+        by_name, by_id
+    ])
 
 # =========================
 # Employees CSV
@@ -128,25 +230,12 @@ def ensure_employees_csv():
             w.writerow(["name", "telegram_id", "status"])
 
 def load_employees() -> dict[int, str]:
-    ensure_employees_csv()
-    employees: dict[int, str] = {}
-    try:
-        with open(EMPLOYEES_CSV, "r", encoding="utf-8") as f:
-            r = csv.DictReader(f)
-            for row in r:
-                if row.get("status", "active") == "active":
-                    employees[int(row["telegram_id"])] = row["name"]
-    except:
-        pass
-    return employees
+    return dict(employees_cache.get())
 
 def save_employees(employees: dict[int, str]):
-    ensure_employees_csv()
-    with open(EMPLOYEES_CSV, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["name", "telegram_id", "status"])
-        for tid, name in employees.items():
-            w.writerow([name, tid, "active"])
+    write_csv_atomic(EMPLOYEES_CSV, ["name", "telegram_id", "status"],
+                     ([name, tid, "active"] for tid, name in employees.items()))
+    employees_cache.put(employees)
 
 # =========================
 # Admins CSV
@@ -159,134 +248,210 @@ def ensure_admins_csv():
             w.writerow(["name", "telegram_id", "status"])
 
 def load_admins() -> dict[int, str]:
-    ensure_admins_csv()
-    admins: dict[int, str] = {}
+    return dict(admins_cache.get())
+
+def save_admins(admins: dict[int, str]):
+    write_csv_atomic(ADMINS_CSV, ["name", "telegram_id", "status"],
+                     ([name, tid, "active"] for tid, name in admins.items()))
+    admins_cache.put(admins)
+
+# =========================
+# Digest settings CSV
+# =========================
+def load_digest_configs():
+    if not os.path.exists(DIGEST_CSV):
+        return
     try:
-        with open(ADMINS_CSV, "r", encoding="utf-8") as f:
-            r = csv.DictReader(f)
-            for row in r:
-                if row.get("status", "active") == "active":
-                    admins[int(row["telegram_id"])] = row["name"]
+        with open(DIGEST_CSV, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                instant = set((row.get("instant") or "").split())
+                digests.configure(int(row["telegram_id"]), int(row["interval"]), instant)
     except:
         pass
-    return admins
 
-def save_admins(admins: dict[int, str]):
-    ensure_admins_csv()
-    with open(ADMINS_CSV, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(["name", "telegram_id", "status"])
-        for tid, name in admins.items():
-            w.writerow([name, tid, "active"])
+def save_digest_configs(rows: list[list[Any]]):
+    write_csv_atomic(DIGEST_CSV, ["telegram_id", "interval", "instant"], rows)
+
+def digest_config_rows() -> list[list[Any]]:
+    # built on the event loop; the write happens in the storage pool
+    return [[uid, cfg.interval, " ".join(sorted(cfg.instant))] for uid, cfg in digests.configs.items()]
 
 def is_owner(user_id: int) -> bool:
     return user_id == OWNER_ID
 
 def is_admin(user_id: int) -> bool:
-    return is_owner(user_id) or (user_id in load_admins())
+    return is_owner(user_id) or (user_id in admins_cache)
+
+def is_employee(user_id: int) -> bool:
+    return user_id in employees_cache
+
+# shared roster cache (O(1) lookups, reload on file change)
+# refresh_rosters_job re-checks the files in the storage pool, so handlers
+# normally never touch the disk themselves
+ROSTER_REFRESH_SECONDS = 2
+employees_cache = RosterCache(EMPLOYEES_CSV, ensure_employees_csv, check_interval=3 * ROSTER_REFRESH_SECONDS)
+admins_cache = RosterCache(ADMINS_CSV, ensure_admins_csv, check_interval=3 * ROSTER_REFRESH_SECONDS)
+
+def refresh_rosters():
+    employees_cache.refresh()
+    admins_cache.refresh()
+
+def ensure_files():
+    ensure_daily_csv()
+    ensure_employees_csv()
+    ensure_admins_csv()
+
+def roster_cache_stats() -> dict[str, dict[str, int]]:
+    return {"employees": employees_cache.stats(), "admins": admins_cache.stats()}
 
 # =========================
 # State
 # =========================
-@dataclass
-class PendingLink:
-    url: str
-    by_id: int
-    by_name: str
-    sent_time: datetime
-    expiry_time: datetime
-    request_after: datetime
-    actions_until: datetime
-
-pending_by_user: dict[int, PendingLink] = {}
-stats_by_user: dict[int, dict[str, int]] = {}
-
-def get_stats(user_id: int) -> dict[str, int]:
-    if user_id not in stats_by_user:
-        stats_by_user[user_id] = {"sent": 0, "copied": 0, "cancelled": 0, "expired": 0}
-    return stats_by_user[user_id]
+def get_stats(user_id: int, day: str | None = None) -> dict[str, int]:
+    return state.user_stats(user_id, day)
 
 def employee_name(user_id: int) -> str:
-    return load_employees().get(user_id, "Unknown")
+    return employees_cache.name(user_id, "Unknown")
 
 # =========================
 # Keyboards
 # =========================
-def build_employee_keyboard(user_id: int) -> InlineKeyboardMarkup:
-    pl = pending_by_user.get(user_id)
-    btns: list[list[InlineKeyboardButton]] = []
+def _keyboard(*rows: list[tuple[str, str]]) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[InlineKeyboardButton(t, callback_data=d) for t, d in row] for row in rows])
+
+# the panel only ever has these states -> build once, reuse
+_ROW_REQUEST = [("➡️ REQUEST LINK", "request_link")]
+_ROW_REQUEST_WAIT = [("➡️ REQUEST (wait 1 min)", "noop")]
+_ROW_COPY = [("📋 COPY LINK", "copy_link")]
+_ROW_ACTIONS = [("❌ Cancel", "cancel_link"), ("🗑 Expire/Remove", "expire_manual")]
+_ROW_ACTIONS_OFF = [("❌ Cancel expired", "noop"), ("🗑 Expire expired", "noop")]
+
+KB_IDLE = _keyboard(_ROW_REQUEST)
+# (actions allowed, request allowed) -> keyboard
+KB_ACTIVE = {
+    (actions, request): _keyboard(
+        _ROW_COPY,
+        _ROW_ACTIONS if actions else _ROW_ACTIONS_OFF,
+        _ROW_REQUEST if request else _ROW_REQUEST_WAIT,
+    )
+    for actions in (True, False)
+    for request in (True, False)
+}
 
+def build_employee_keyboard(user_id: int) -> InlineKeyboardMarkup:
+    pl = state.get(user_id)
     if not pl:
-        btns.append([InlineKeyboardButton("➡️ REQUEST LINK", callback_data="request_link")])
-        return InlineKeyboardMarkup(btns)
+        return KB_IDLE
+    now = now_ts()
+    return KB_ACTIVE[(now <= pl.actions_until, now >= pl.request_after)]
 
-    btns.append([InlineKeyboardButton("📋 COPY LINK", callback_data="copy_link")])
-
-    if datetime.now() <= pl.actions_until:
-        btns.append([
-            InlineKeyboardButton("❌ Cancel", callback_data="cancel_link"),
-            InlineKeyboardButton("🗑 Expire/Remove", callback_data="expire_manual"),
-        ])
-    else:
-        btns.append([
-            InlineKeyboardButton("❌ Cancel expired", callback_data="noop"),
-            InlineKeyboardButton("🗑 Expire expired", callback_data="noop"),
-        ])
-
-    if datetime.now() < pl.request_after:
-        btns.append([InlineKeyboardButton("➡️ REQUEST (wait 1 min)", callback_data="noop")])
-    else:
-        btns.append([InlineKeyboardButton("➡️ REQUEST LINK", callback_data="request_link")])
-
-    return InlineKeyboardMarkup(btns)
+# =========================
+# Employee panel (one message per employee, edited in place)
+# =========================
+panel_msg_by_user: dict[int, int] = {}
 
-async def send_employee_panel(context: ContextTypes.DEFAULT_TYPE, user_id: int):
+def employee_panel_view(user_id: int) -> tuple[str, InlineKeyboardMarkup | None]:
     stats = get_stats(user_id)
     if stats["sent"] >= MAX_LINKS_PER_USER:
-        await context.bot.send_message(user_id, "🎉 Congrats! 75 links complete! Kal milte hain 🎯")
-        return
+        return "🎉 Congrats! 75 links complete! Kal milte hain 🎯", None
 
-    pl = pending_by_user.get(user_id)
+    pl = state.get(user_id)
     if pl:
-        left = int((pl.expiry_time - datetime.now()).total_seconds())
+        now = now_ts()
+        left = int(pl.expiry_time - now)
         if left < 0: left = 0
-        allow_in = int((pl.request_after - datetime.now()).total_seconds())
+        allow_in = int(pl.request_after - now)
         if allow_in < 0: allow_in = 0
         text = (
-            f"🔗 Active Link (By {pl.by_name}):
-<code>{pl.url}</code>
-
-"
-            f"⏳ Expire in: {left}s
-"
-            f"🕒 REQUEST in: {allow_in}s
-"
+            f"🔗 Active Link (By {pl.by_name}):\n<code>{pl.url}</code>\n\n"
+            f"⏳ Expire in: {left}s\n"
+            f"🕒 REQUEST in: {allow_in}s\n"
             f"📊 {stats['sent']}/{MAX_LINKS_PER_USER} | Copied: {stats['copied']}"
         )
+    elif user_id in waitlist:
+        text = (
+            "⏳ Waiting for link...\n"
+            f"🎟 Queue: #{waitlist.position(user_id)} (link aate hi mil jayega)\n\n"
+            f"📊 {stats['sent']}/{MAX_LINKS_PER_USER}"
+        )
     else:
         text = (
-            "✅ Ready!
-REQUEST LINK dabao
-
-"
+            "✅ Ready!\nREQUEST LINK dabao\n\n"
             f"📊 {stats['sent']}/{MAX_LINKS_PER_USER}"
         )
+    return text, build_employee_keyboard(user_id)
+
+async def send_employee_panel(user_id: int, notice: str = "", new_message: bool = False):
+    # notice = short status line on top ("❌ Cancelled" etc.) instead of a separate message
+    text, kb = employee_panel_view(user_id)
+    if notice:
+        text = f"{notice}\n\n{text}"
+    kwargs = {"text": text, "reply_markup": kb, "parse_mode": "HTML", "disable_web_page_preview": True}
+
+    msg_id = panel_msg_by_user.get(user_id)
+    if msg_id and not new_message:
+        try:
+            await outbox.submit("edit_message_text", user_id, message_id=msg_id, **kwargs)
+            return
+        except BadRequest:
+            pass    # panel deleted / too old -> fresh one below
 
-    await context.bot.send_message(
-        chat_id=user_id,
-        text=text,
-        reply_markup=build_employee_keyboard(user_id),
-        parse_mode="HTML",
-        disable_web_page_preview=True,
+    msg = await outbox.submit("send_message", user_id, **kwargs)
+    if msg is not None:
+        panel_msg_by_user[user_id] = msg.message_id
+
+# =========================
+# Live panel refresh (optional)
+# ek shared ticker active panels ka countdown edit karta hai (budget ke andar),
+# keyboard flip (REQUEST allowed / actions over) exact time pe
+# =========================
+live_last_edit: dict[int, float] = {}
+
+def live_refresh(user_id: int, priority: int = PRIO_LIVE) -> bool:
+    msg_id = panel_msg_by_user.get(user_id)
+    if not msg_id or state.get(user_id) is None:
+        return False
+    text, kb = employee_panel_view(user_id)
+    outbox.fire(
+        "edit_message_text", user_id, priority,
+        message_id=msg_id, text=text, reply_markup=kb,
+        parse_mode="HTML", disable_web_page_preview=True,
     )
+    live_last_edit[user_id] = time.monotonic()
+    return True
+
+async def live_panel_job(context: ContextTypes.DEFAULT_TYPE):
+    if outbox.queue_length > LIVE_MAX_OUTBOX_QUEUE:
+        return
+    budget = max(1, int(LIVE_EDITS_PER_SECOND * LIVE_PANEL_SECONDS))
+    active = [uid for uid in state.pending_users() if uid in panel_msg_by_user]
+    # least recently refreshed first, so everyone gets a turn when over budget
+    active.sort(key=lambda uid: live_last_edit.get(uid, 0.0))
+    for uid in active[:budget]:
+        live_refresh(uid)
+
+def schedule_panel_flip(user_id: int):
+    pl = state.get(user_id)
+    if not pl or not LIVE_PANEL_SECONDS:
+        return
+    now = now_ts()
+    # expiry sends a fresh panel anyway -> only flips before that
+    nxt = [t for t in (pl.request_after, pl.actions_until) if now < t < pl.expiry_time]
+    if nxt:
+        panel_flips.schedule(user_id, min(nxt))
+
+async def flip_panels(user_ids: list):
+    for uid in user_ids:
+        if live_refresh(uid, priority=PRIO_EMPLOYEE):
+            schedule_panel_flip(uid)
+
+panel_flips = ExpiryScheduler(metrics.wrap(flip_panels, "timer"))
 
 # =========================
 # Commands
 # =========================
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    ensure_daily_csv()
-    ensure_employees_csv()
-    ensure_admins_csv()
+    await run_io(ensure_files)
 
     user_id = update.effective_user.id
     first = update.effective_user.first_name or "User"
@@ -294,38 +459,32 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if is_admin(user_id):
         emp = load_employees()
         adm = load_admins()
-        await update.message.reply_text(
-            f"👑 Admin/Owner Panel
-
-"
-            f"👥 Employees: {len(emp)}
-"
-            f"🛡 Admins: {len(adm)}
-"
-            f"📦 Pool: {len(link_pool)} links
-
-"
-            "📋 Commands:
-"
-            "/totallinksend - Employees stats
-"
-            "/contributors - Owner/Admin link stats
-"
-            "/remove <name>
-"
-            "/sheet 16/10/25
-"
-            "/adminlist
-
-"
-            "💡 Send HTTP links → POOL!"
+        await reply(
+            update,
+            f"👑 Admin/Owner Panel\n\n"
+            f"👥 Employees: {len(emp)}\n"
+            f"🛡 Admins: {len(adm)}\n"
+            f"📦 Pool: {state.queued()} links\n"
+            f"📤 Outbox: {outbox.queue_length} queued | {outbox.dropped} dropped\n\n"
+            "📋 Commands:\n"
+            "/totallinksend [16/10/25] - Employees stats\n"
+            "/contributors [16/10/25] - Owner/Admin link stats\n"
+            "/backlog - Pool per contributor\n"
+            f"/poolmode {'|'.join(POOL_MODES)} - link order (owner, saved)\n"
+            "/remove <name>\n"
+            "/sheet 16/10/25 [31/10/25] [employee= by= status=]\n"
+            "/analytics [16/10/25] [31/10/25] - copy time, cancel/expiry, hourly\n"
+            "/adminlist\n"
+            "/digest 60 - notification digest\n"
+            "/perf [reset] - latency, API calls, disk (owner)\n"
+            "/profile 60 - hot functions + flame graph stacks (owner)\n\n"
+            "💡 Send HTTP links → POOL!\n"
+            "📎 Bulk: multi-line paste ya .txt/.csv file"
         )
         return
 
-    emp = load_employees()
-    if user_id in emp:
-        await update.message.reply_text("👋 Welcome back!")
-        await send_employee_panel(context, user_id)
+    if is_employee(user_id):
+        await send_employee_panel(user_id, notice="👋 Welcome back!", new_message=True)
         return
 
     # New employee approval -> owner
@@ -333,12 +492,12 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         InlineKeyboardButton("✅ Accept", callback_data=f"req_emp_accept|{user_id}|{first}"),
         InlineKeyboardButton("❌ Reject", callback_data=f"req_emp_reject|{user_id}|{first}")
     ]]
-    await context.bot.send_message(
-        chat_id=OWNER_ID,
-        text=f"🔔 New EMPLOYEE: {first} (ID: {user_id})",
+    outbox.post(
+        OWNER_ID,
+        f"🔔 New EMPLOYEE: {first} (ID: {user_id})",
         reply_markup=InlineKeyboardMarkup(keyboard),
     )
-    await update.message.reply_text("🔄 Owner approval pending...")
+    await reply(update, "🔄 Owner approval pending...")
 
 async def admin_request(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
@@ -346,249 +505,514 @@ async def admin_request(update: Update, context: ContextTypes.DEFAULT_TYPE):
     name = user.first_name or "User"
 
     if is_admin(uid):
-        return await update.message.reply_text("✅ Aap already admin/owner ho.")
+        return await reply(update, "✅ Aap already admin/owner ho.")
 
     kb = [[
         InlineKeyboardButton("✅ Make Admin", callback_data=f"req_admin_accept|{uid}|{name}"),
         InlineKeyboardButton("❌ Reject", callback_data=f"req_admin_reject|{uid}|{name}")
     ]]
-    await context.bot.send_message(
-        chat_id=OWNER_ID,
-        text=f"🆕 Admin request: {name} (ID: {uid})",
+    outbox.post(
+        OWNER_ID,
+        f"🆕 Admin request: {name} (ID: {uid})",
         reply_markup=InlineKeyboardMarkup(kb),
     )
-    await update.message.reply_text("🔄 Admin request owner ko bhej di. Approval ka wait karo.")
+    await reply(update, "🔄 Admin request owner ko bhej di. Approval ka wait karo.")
 
 async def admin_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.effective_user.id):
-        return await update.message.reply_text("❌ Owner/Admin only!")
+        return await reply(update, "❌ Owner/Admin only!")
 
     admins = load_admins()
-    text = "👑 Admins List
-
-"
-    text += f"OWNER: {OWNER_ID}
-"
+    text = "👑 Admins List\n\n"
+    text += f"OWNER: {OWNER_ID}\n"
     for uid, nm in admins.items():
-        text += f"- {nm} (ID: {uid})
-"
-    await update.message.reply_text(text)
+        text += f"- {nm} (ID: {uid})\n"
+    await reply(update, text)
+
+async def day_counters(args: list[str]) -> DayCounters:
+    # no arg = today (live); dd/mm/yy = memory if retained, else rebuilt from that day's sheet
+    if not args:
+        return state.counters()
+    day = sheet_date_str(parse_ddmmyy(args[0]))
+    dc = state.counters(day)
+    if dc is not None:
+        return dc
+    return await run_io(counters_from_csv, os.path.join(DATA_DIR, f"{day}.csv"), day)
 
 async def contributors(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.effective_user.id):
-        return await update.message.reply_text("❌ Owner/Admin only!")
+        return await reply(update, "❌ Owner/Admin only!")
+
+    try:
+        dc = await day_counters(context.args)
+    except ValueError:
+        return await reply(update, "Usage: /contributors [16/10/25]")
 
     # Ensure owner shows even if never added (optional)
     owner_label = "OWNER"
-    get_sender_stats(OWNER_ID, owner_label)
+    dc.sender(OWNER_ID, owner_label)
 
-    lines = ["📦 CONTRIBUTOR STATS (Owner/Admin)
-"]
+    lines = [f"📦 CONTRIBUTOR STATS (Owner/Admin) — {dc.day}\n"]
     # show OWNER first then admins
     order = [OWNER_ID] + [uid for uid in load_admins().keys() if uid != OWNER_ID]
 
     for uid in order:
-        st = sender_stats.get(uid)
+        st = dc.get_sender(uid)
         if not st:
             continue
         name = st.get("name", sender_display(uid))
         lines.append(
-            f"{name}:
-"
-            f"  • Links added: {st['added']}
-"
-            f"  • Copied: {st['copied']}
-"
-            f"  • Cancelled: {st['cancelled']}
-"
-            f"  • Expired/Removed: {st['expired']}
-"
+            f"{name}:\n"
+            f"  • Links added: {st['added']}\n"
+            f"  • Copied: {st['copied']}\n"
+            f"  • Cancelled: {st['cancelled']}\n"
+            f"  • Expired/Removed: {st['expired']}\n"
         )
 
-    await update.message.reply_text("
-".join(lines))
+    await reply(update, "\n".join(lines))
 
 async def totallinksend(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.effective_user.id):
-        return await update.message.reply_text("❌ Owner/Admin only!")
+        return await reply(update, "❌ Owner/Admin only!")
 
-    emp = load_employees()
-    text = f"📊 EMPLOYEE STATS
-Pool: {len(link_pool)}
+    try:
+        dc = await day_counters(context.args)
+    except ValueError:
+        return await reply(update, "Usage: /totallinksend [16/10/25]")
 
-"
+    emp = load_employees()
+    text = f"📊 EMPLOYEE STATS — {dc.day}\nPool: {state.queued()}\n\n"
     for uid, nm in emp.items():
-        st = get_stats(uid)
+        st = dc.get_user(uid) or dict.fromkeys(USER_FIELDS, 0)
         text += (
-            f"👤 {nm}
-"
-            f"Sent: {st['sent']} | Copied: {st['copied']}
-"
-            f"Cancel: {st['cancelled']} | Expire: {st['expired']}
+            f"👤 {nm}\n"
+            f"Sent: {st['sent']} | Copied: {st['copied']}\n"
+            f"Cancel: {st['cancelled']} | Expire: {st['expired']}\n\n"
+        )
+    await reply(update, text)
+
+async def digest_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    uid = update.effective_user.id
+    if not is_admin(uid):
+        return await reply(update, "❌ Owner/Admin only!")
+
+    kinds = " ".join(EVENT_LABELS)
+    if not context.args:
+        cfg = digests.config_for(uid)
+        mode = f"every {cfg.interval}s" if cfg.interval > 0 else "instant"
+        return await reply(
+            update,
+            f"📬 Digest: {mode}\n"
+            f"⚡ Instant: {' '.join(sorted(cfg.instant)) or '-'}\n\n"
+            f"Usage: /digest 60 [instant types...] | /digest off\n"
+            f"Types: {kinds}"
+        )
 
-"
+    if context.args[0].lower() == "off":
+        interval, instant = 0, set()
+    else:
+        try:
+            interval = int(context.args[0])
+        except ValueError:
+            return await reply(update, "Usage: /digest 60 [instant types...] | /digest off")
+        instant = {a.lower() for a in context.args[1:]}
+        bad = instant - set(EVENT_LABELS)
+        if bad:
+            return await reply(update, f"❌ Unknown type: {' '.join(sorted(bad))}\nTypes: {kinds}")
+
+    digests.configure(uid, interval, instant)
+    await run_io(save_digest_configs, digest_config_rows())
+    await reply(
+        update,
+        f"✅ Digest {'every ' + str(interval) + 's' if interval > 0 else 'off (instant)'}"
+    )
+
+async def backlog_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id):
+        return await reply(update, "❌ Owner/Admin only!")
+
+    mode, weights = state.mode, state.weights
+    lines = [f"📦 POOL BACKLOG ({mode})\nTotal: {state.queued()}\n"]
+    for by_id, by_name, n in state.backlog():
+        w = f" | w={weights[by_id]:g}" if mode == "wfq" and by_id in weights else ""
+        lines.append(f"{by_name} (ID {by_id}): {n}{w}")
+    await reply(update, "\n".join(lines))
+
+async def poolmode_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_owner(update.effective_user.id):
+        return await reply(update, "❌ Owner only!")
+    if len(context.args) != 1 or context.args[0].lower() not in POOL_MODES:
+        return await reply(
+            update,
+            f"Usage: /poolmode {'|'.join(POOL_MODES)}\nNow: {state.mode}"
         )
-    await update.message.reply_text(text)
+
+    await transition(state.set_mode, context.args[0].lower())
+    await reply(
+        update,
+        f"✅ Pool mode: {state.mode}\n💾 Saved: restart ke baad bhi yahi (POOL_MODE setting se upar)"
+    )
 
 async def remove_employee(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.effective_user.id) or len(context.args) != 1:
-        return await update.message.reply_text("Usage: /remove Irfan")
+        return await reply(update, "Usage: /remove Irfan")
 
     target = context.args[0].strip().lower()
-    emp = load_employees()
-    for uid, nm in list(emp.items()):
-        if nm.lower() == target:
-            del emp[uid]
-            save_employees(emp)
-            pending_by_user.pop(uid, None)
-            await context.bot.send_message(uid, "❌ Removed")
-            return await update.message.reply_text(f"✅ {nm} removed")
-    await update.message.reply_text(f"❌ {target} not found")
+    async with roster_lock:
+        emp = load_employees()
+        uid = next((u for u, nm in emp.items() if nm.lower() == target), None)
+        if uid is None:
+            return await reply(update, f"❌ {target} not found")
+        nm = emp.pop(uid)
+        await run_io(save_employees, emp)
+
+    async with user_locks.hold(uid):
+        waitlist.remove(uid)
+        if await transition(state.finish, uid, "drop"):
+            expiry.cancel(uid)
+    await outbox.send(uid, "❌ Removed")
+    await reply(update, f"✅ {nm} removed")
+
+SHEET_USAGE = "Usage: /sheet 16/10/25 [31/10/25] [employee=Irfan] [by=OWNER] [status=done]"
 
 async def sheet_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if not is_admin(update.effective_user.id) or len(context.args) != 1:
-        return await update.message.reply_text("Usage: /sheet 16/10/25")
+    if not is_admin(update.effective_user.id) or not context.args:
+        return await reply(update, SHEET_USAGE)
+
+    dates = [a for a in context.args if "=" not in a]
+    if not 1 <= len(dates) <= 2:
+        return await reply(update, SHEET_USAGE)
 
     try:
-        d = parse_ddmmyy(context.args[0])
-        path = os.path.join(DATA_DIR, f"{sheet_date_str(d)}.csv")
-        if not os.path.exists(path):
-            return await update.message.reply_text(f"❌ No data for {context.args[0]}")
-
-        with open(path, "rb") as f:
-            await context.bot.send_document(
-                chat_id=update.effective_user.id,
-                document=f,
-                filename=f"sheet_{context.args[0]}.csv",
-                caption=f"📄 {context.args[0]}"
+        d_from, d_to = parse_ddmmyy(dates[0]), parse_ddmmyy(dates[-1])
+        flt = parse_filters([a for a in context.args if "=" in a])
+        await run_io(daily_writer.flush)
+
+        # one day, no filters -> raw day file as before
+        if len(dates) == 1 and not flt:
+            path = os.path.join(DATA_DIR, f"{sheet_date_str(d_from)}.csv")
+            data = await run_io(read_bytes, path)
+            if data is None:
+                return await reply(update, f"❌ No data for {dates[0]}")
+
+            return await outbox.submit(
+                "send_document", update.effective_user.id,
+                document=data,
+                filename=f"sheet_{dates[0]}.csv",
+                caption=f"📄 {dates[0]}"
             )
+
+        tmp = tempfile.mkdtemp(prefix="sheet-")
+        try:
+            parts = await run_io(export_range, DATA_DIR, d_from, d_to, flt, tmp, DAILY_HEADERS)
+            if not parts:
+                return await reply(update, f"❌ No data for {dates[0]} → {dates[-1]}")
+
+            label = f"{dates[0]} → {dates[-1]}"
+            if flt:
+                label += " | " + " ".join(f"{k}={v}" for k, v in flt.items())
+            for i, (path, rows) in enumerate(parts, 1):
+                data = await run_io(read_bytes, path)
+                part = f" | part {i}/{len(parts)}" if len(parts) > 1 else ""
+                await outbox.submit(
+                    "send_document", update.effective_user.id,
+                    document=data,
+                    filename=os.path.basename(path),
+                    caption=f"📄 {label}\n{rows} rows{part}"
+                )
+        finally:
+            await run_io(shutil.rmtree, tmp, True)
     except Exception as e:
-        await update.message.reply_text(f"❌ Error: {e}")
+        await reply(update, f"❌ Error: {e}")
+
+ANALYTICS_USAGE = "Usage: /analytics [16/10/25] [31/10/25]  (default: aaj)"
+
+async def analytics_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id):
+        return await reply(update, "❌ Owner/Admin only!")
+    if len(context.args) > 2:
+        return await reply(update, ANALYTICS_USAGE)
+
+    try:
+        if context.args:
+            d_from, d_to = parse_ddmmyy(context.args[0]), parse_ddmmyy(context.args[-1])
+        else:
+            d_from = d_to = date.today()
+        days = days_between(d_from, d_to)
+        await run_io(daily_writer.flush)
+        merged, names, found = await run_io(summarize_range, DATA_DIR, days, ANALYTICS_DIR)
+    except ValueError:
+        return await reply(update, ANALYTICS_USAGE)
+    except OSError as e:
+        return await reply(update, f"❌ Error: {e}")
+
+    label = f"{days[0]:%d/%m/%y}" if len(days) == 1 else f"{days[0]:%d/%m/%y} → {days[-1]:%d/%m/%y}"
+    if not found:
+        return await reply(update, f"❌ No data for {label}")
+    await reply(update, format_report(merged, names, label, found, ANALYTICS_TOP))
 
 # =========================
 # Owner/Admin link message (POOL)
 # =========================
+INGEST_CHUNK = 5000
+
+async def add_links(sender_id: int, sender_name: str, urls: list[str]) -> tuple[int, int, int]:
+    # returns (added, duplicates, already done); one journal entry per chunk, yields to the loop between chunks
+    added_total = done_total = 0
+    for i in range(0, len(urls), INGEST_CHUNK):
+        chunk, done = done_index.filter(urls[i:i + INGEST_CHUNK])
+        done_total += done
+        if chunk:
+            added_total += len(await transition(state.add_links, sender_id, sender_name, chunk))
+        if i + INGEST_CHUNK < len(urls):
+            await asyncio.sleep(0)
+
+    if added_total:
+        kick_waitlist()
+    if done_total:
+        metrics.inc("links_rejected_total", done_total, reason="done")
+    return added_total, len(urls) - added_total - done_total, done_total
+
+async def reply_ingest_summary(update: Update, sender_name: str, added: int, duplicates: int, done: int,
+                               invalid: int):
+    await reply(
+        update,
+        f"📥 Bulk links → POOL\n"
+        f"👤 By: {sender_name}\n"
+        f"✅ Added: {added}\n"
+        f"♻️ Duplicates: {duplicates}\n"
+        f"🚫 Already done: {done}\n"
+        f"⚠️ Invalid: {invalid}\n"
+        f"📦 Total: {state.queued()}"
+    )
+
 async def owner_link_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.effective_user.id):
         return
 
     text = (update.message.text or "").strip()
-    if not text.startswith("http"):
+    if "http" not in text:
         return
 
     sender_id = update.effective_user.id
     sender_name = sender_display(sender_id, update.effective_user.first_name or "Admin")
 
-    link_pool.append({"url": text, "by_id": sender_id, "by_name": sender_name})
+    res = parse_text(text)
+    if not res.candidates:
+        # just mentions "http" (no link in it) -> ordinary message, stay quiet
+        return
+    added, dups, done = await add_links(sender_id, sender_name, res.urls)
+    dups += res.duplicates
+
+    if added == 1 and dups == 0 and done == 0 and res.invalid == 0:
+        return await reply(
+            update,
+            f"✅ Link added to POOL!\n"
+            f"👤 By: {sender_name}\n"
+            f"📦 Total: {state.queued()}\n"
+            f"💡 Employees REQUEST karega tab milega!"
+        )
+    if added == 0 and dups == 1 and done == 0 and res.invalid == 0:
+        return await reply(
+            update,
+            f"⚠️ Duplicate! Ye link already pool/assigned me hai.\n"
+            f"📦 Total: {state.queued()}"
+        )
+    if added == 0 and dups == 0 and done == 1 and res.invalid == 0:
+        return await reply(
+            update,
+            f"🚫 Ye link pehle hi DONE (copied) ho chuka hai, pool me nahi dala.\n"
+            f"📦 Total: {state.queued()}"
+        )
+    await reply_ingest_summary(update, sender_name, added, dups, done, res.invalid)
+
+async def owner_document_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_admin(update.effective_user.id):
+        return
 
-    st = get_sender_stats(sender_id, sender_name)
-    st["added"] += 1
+    doc = update.message.document
+    filename = doc.file_name or "links.txt"
+    if doc.file_size and doc.file_size > MAX_UPLOAD_BYTES:
+        return await reply(update, "❌ File too big (max 20 MB)")
 
-    await update.message.reply_text(
-        f"✅ Link added to POOL!
-"
-        f"👤 By: {sender_name}
-"
-        f"📦 Total: {len(link_pool)}
-"
-        f"💡 Employees REQUEST karega tab milega!"
-    )
+    sender_id = update.effective_user.id
+    sender_name = sender_display(sender_id, update.effective_user.first_name or "Admin")
+
+    try:
+        tg_file = await doc.get_file()
+        data = await tg_file.download_as_bytearray()
+    except Exception as e:
+        return await reply(update, f"❌ Error: {e}")
+
+    # parse in the storage pool, 100k lines shouldn't stall other employees
+    res = await run_io(parse_upload, bytes(data), filename)
+    added, dups, done = await add_links(sender_id, sender_name, res.urls)
+    await reply_ingest_summary(update, sender_name, added, dups + res.duplicates, done, res.invalid)
 
 # =========================
 # Assign Link
 # =========================
-async def assign_link_to_user(context: ContextTypes.DEFAULT_TYPE, user_id: int, item: Dict[str, Any]):
-    name = employee_name(user_id)
-    sent_time = datetime.now()
-    expiry_time = sent_time + timedelta(seconds=LINK_EXPIRE_SECONDS)
-
-    url = item["url"]
-    by_id = int(item["by_id"])
-    by_name = str(item["by_name"])
+def mark_done(user_id: int, pl: PendingLink, note: str):
+    # state already finished by the backend -> timer + sheet + history
+    expiry.cancel(user_id)
+    done_index.add(pl.url)
+    append_daily_row(
+        employee_name(user_id), user_id, pl.url, "done",
+        done_time=now_str(),
+        note=note,
+        by_name=pl.by_name,
+        by_id=pl.by_id
+    )
 
-    pending_by_user[user_id] = PendingLink(
-        url=url,
-        by_id=by_id,
-        by_name=by_name,
+def new_pending(item: LinkItem) -> PendingLink:
+    sent_time = now_ts()
+    return PendingLink(
+        url=item.url,
+        by=item.by,
         sent_time=sent_time,
-        expiry_time=expiry_time,
-        request_after=sent_time + timedelta(seconds=REQUEST_COOLDOWN_SECONDS),
-        actions_until=sent_time + timedelta(seconds=CANCEL_ACTIVE_SECONDS),
+        expiry_time=sent_time + LINK_EXPIRE_SECONDS,
+        request_after=sent_time + REQUEST_COOLDOWN_SECONDS,
+        actions_until=sent_time + CANCEL_ACTIVE_SECONDS,
     )
 
-    get_stats(user_id)["sent"] += 1
+async def request_next_link(user_id: int, new_panel: bool = False) -> bool:
+    # caller checked cooldown and holds user_locks[user_id]
+    # pop + assign is one backend transition (exactly once, even across workers)
+    pl, old = await transition(state.take, user_id, new_pending)
+    if pl is None:
+        return False
+    waitlist.remove(user_id)
+    # if old link active and user requests after cooldown: counted as done
+    if old:
+        mark_done(user_id, old, "Requested new after cooldown")
+    await assign_link_to_user(user_id, pl, new_panel)
+    return True
+
+# =========================
+# Wait list -> auto-assign when links come back
+# =========================
+waitlist_task: asyncio.Task | None = None
+
+def kick_waitlist():
+    # call after anything put links into the pool
+    global waitlist_task
+    if waitlist and waitlist_task is None and state.queued():
+        waitlist_task = asyncio.create_task(serve_waitlist())
+
+async def serve_waitlist():
+    global waitlist_task
+    # still in cooldown: back at the head once the ones behind are served
+    deferred: list[tuple[int, PendingLink]] = []
+    try:
+        while waitlist and state.queued():
+            uid = waitlist.pop()
+            try:
+                async with user_locks.hold(uid):
+                    if not is_employee(uid) or get_stats(uid)["sent"] >= MAX_LINKS_PER_USER:
+                        continue
+                    pl = state.get(uid)
+                    if pl and now_ts() < pl.request_after:
+                        deferred.append((uid, pl))
+                        continue
+                    # fresh message so the waiting employee gets notified
+                    if not await request_next_link(uid, new_panel=True):
+                        # pool drained meanwhile -> keep their place
+                        waitlist.push_front(uid)
+                        break
+            except Exception as e:
+                print(f"❌ Wait-list assign failed for {uid}: {e}")
+    finally:
+        # (unless they got a link some other way meanwhile)
+        deferred = [(uid, pl) for uid, pl in deferred
+                    if (cur := state.get(uid)) is not None and same_assignment(cur, pl)]
+        for uid, _ in reversed(deferred):
+            waitlist.push_front(uid)
+        if deferred:
+            wait = min(pl.request_after for _, pl in deferred) - now_ts()
+            asyncio.get_running_loop().call_later(max(wait, 0) + 0.05, kick_waitlist)
+        waitlist_task = None
+
+async def assign_link_to_user(user_id: int, pl: PendingLink, new_panel: bool = False):
+    # pl is already recorded by the backend
+    name = employee_name(user_id)
+    url, by_id, by_name, expiry_time = pl.url, pl.by_id, pl.by_name, pl.expiry_time
+    expiry.schedule(user_id, expiry_time)
+    schedule_panel_flip(user_id)
 
     append_daily_row(
         name, user_id, url, "pending",
         sent_time=now_str(),
-        expiry_time=expiry_time.strftime("%Y-%m-%d %H:%M:%S"),
+        expiry_time=datetime.fromtimestamp(expiry_time).strftime("%Y-%m-%d %H:%M:%S"),
         note="Assigned",
         by_name=by_name,
         by_id=by_id
     )
 
     # notify owner + sender who contributed the link
-    await context.bot.send_message(OWNER_ID, f"✅ {name} → got link (By {by_name})")
+    notify_owner("assign", f"✅ {name} → got link (By {by_name})")
     if by_id != OWNER_ID:
-        await notify_sender(context, by_id, f"📌 Your link assigned to: {name} (ID {user_id})
-{url}")
+        notify_sender("assign", by_id, f"📌 Your link assigned to: {name} (ID {user_id})\n{url}")
 
-    await send_employee_panel(context, user_id)
-
-    context.job_queue.run_once(
-        expire_job,
-        when=LINK_EXPIRE_SECONDS,
-        data={"user_id": user_id, "url": url, "by_id": by_id, "by_name": by_name},
-    )
+    await send_employee_panel(user_id, new_message=new_panel)
 
 # =========================
-# Jobs
+# Expiry (single heap-backed timer)
 # =========================
-async def expire_job(context: ContextTypes.DEFAULT_TYPE):
-    data = context.job.data
-    user_id = data.get("user_id")
-    url = data.get("url")
-    by_id = int(data.get("by_id"))
-    by_name = str(data.get("by_name"))
-
-    pl = pending_by_user.get(user_id)
-    if not pl or pl.url != url:
-        return
-
-    name = employee_name(user_id)
-    st = get_stats(user_id)
-    st["expired"] += 1
-
-    # back to pool on timer expire
-    link_pool.append({"url": url, "by_id": by_id, "by_name": by_name})
-
-    # contributor stats
-    get_sender_stats(by_id, by_name)["expired"] += 1
+async def expire_due(user_ids: list):
+    results = await asyncio.gather(*(expire_assignment(uid) for uid in user_ids), return_exceptions=True)
+    for uid, r in zip(user_ids, results):
+        if isinstance(r, Exception):
+            print(f"❌ Expire failed for {uid}: {r}")
+
+expiry = ExpiryScheduler(metrics.wrap(expire_due, "timer"))
+
+async def expire_assignment(user_id: int):
+    async with user_locks.hold(user_id):
+        pl = state.get(user_id)
+        # gone, or replaced by a newer assignment while we waited for the lock
+        if not pl or pl.expiry_time > now_ts() + 0.1:
+            return
+        # back to pool; None = another worker finished it first
+        if not await transition(state.finish, user_id, "expire", expect=pl):
+            return
+        kick_waitlist()
+        url, by_id, by_name = pl.url, pl.by_id, pl.by_name
+        name = employee_name(user_id)
 
-    append_daily_row(
-        name, user_id, url, "expired",
-        expired_time=now_str(),
-        note="Timer expired → pool",
-        by_name=by_name,
-        by_id=by_id
-    )
+        append_daily_row(
+            name, user_id, url, "expired",
+            expired_time=now_str(),
+            note="Timer expired → pool",
+            by_name=by_name,
+            by_id=by_id
+        )
 
-    pending_by_user.pop(user_id, None)
-    await context.bot.send_message(user_id, f"⌛ Expired! REQUEST new.
-By: {by_name}")
-    await context.bot.send_message(OWNER_ID, f"♻️ {name} expired (back to pool)
-By: {by_name}")
+        await send_employee_panel(user_id, notice=f"⌛ Expired! REQUEST new.\nBy: {by_name}", new_message=True)
+    notify_owner("expire", f"♻️ {name} expired (back to pool)\nBy: {by_name}")
     if by_id != OWNER_ID:
-        await notify_sender(context, by_id, f"♻️ Expired: {name} (ID {user_id})
-Link back to pool
-{url}")
+        notify_sender("expire", by_id, f"♻️ Expired: {name} (ID {user_id})\nLink back to pool\n{url}")
 
 # =========================
 # Callbacks
 # =========================
+CALLBACK_ACTIONS = ("noop", "request_link", "copy_link", "cancel_link", "expire_manual")
+
+def callback_action(data: str) -> str:
+    # metric label; approvals carry user id/name in the data
+    for prefix in ("req_emp_", "req_admin_"):
+        if data.startswith(prefix):
+            return prefix.rstrip("_")
+    return data if data in CALLBACK_ACTIONS else "other"
+
 async def callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
+    # double taps / parallel updates of one user are handled in order
+    with metrics.timer("action_seconds", action=callback_action(query.data or "")):
+        async with user_locks.hold(query.from_user.id):
+            await handle_callback(query)
+
+async def handle_callback(query):
     user_id = query.from_user.id
     data = query.data or ""
 
@@ -602,133 +1026,103 @@ async def callbacks(update: Update, context: ContextTypes.DEFAULT_TYPE):
         target_id = int(uid_str)
 
         if action == "req_emp_accept":
-            emp = load_employees()
-            emp[target_id] = name
-            save_employees(emp)
-            await context.bot.send_message(target_id, "🎉 Approved as EMPLOYEE! /start karo.")
-            await query.edit_message_text(f"✅ EMPLOYEE {name} approved")
-            await send_employee_panel(context, target_id)
+            async with roster_lock:
+                emp = load_employees()
+                emp[target_id] = name
+                await run_io(save_employees, emp)
+            await edit_pressed(query, f"✅ EMPLOYEE {name} approved")
+            await send_employee_panel(target_id, notice="🎉 Approved as EMPLOYEE!", new_message=True)
             return
 
         if action == "req_emp_reject":
-            await context.bot.send_message(target_id, "❌ Employee request rejected")
-            await query.edit_message_text(f"❌ EMPLOYEE {name} rejected")
+            await outbox.send(target_id, "❌ Employee request rejected")
+            await edit_pressed(query, f"❌ EMPLOYEE {name} rejected")
             return
 
         if action == "req_admin_accept":
-            admins = load_admins()
-            admins[target_id] = name
-            save_admins(admins)
-            await context.bot.send_message(
+            async with roster_lock:
+                admins = load_admins()
+                admins[target_id] = name
+                await run_io(save_admins, admins)
+            await outbox.send(
                 target_id,
-                "🎉 Congrats! Ab aap ADMIN ho.
-"
-                "HTTP links bhejo → POOL
-"
+                "🎉 Congrats! Ab aap ADMIN ho.\n"
+                "HTTP links bhejo → POOL\n"
                 "Commands: /contributors /totallinksend /sheet /remove"
             )
-            await query.edit_message_text(f"✅ ADMIN {name} approved")
+            await edit_pressed(query, f"✅ ADMIN {name} approved")
             return
 
         if action == "req_admin_reject":
-            await context.bot.send_message(target_id, "❌ Admin request rejected")
-            await query.edit_message_text(f"❌ ADMIN {name} rejected")
+            await outbox.send(target_id, "❌ Admin request rejected")
+            await edit_pressed(query, f"❌ ADMIN {name} rejected")
             return
 
     if data == "noop":
         return
 
     # employee only callbacks
-    if user_id not in load_employees():
-        return await context.bot.send_message(user_id, "❌ Not approved employee!")
+    if not is_employee(user_id):
+        return await outbox.send(user_id, "❌ Not approved employee!")
+
+    # the pressed message is the employee's panel -> keep editing that one
+    if query.message:
+        panel_msg_by_user[user_id] = query.message.message_id
 
-    pl = pending_by_user.get(user_id)
+    pl = state.get(user_id)
     name = employee_name(user_id)
-    st = get_stats(user_id)
 
     # REQUEST LINK
     if data == "request_link":
-        if pl and datetime.now() < pl.request_after:
-            wait = int((pl.request_after - datetime.now()).total_seconds())
+        now = now_ts()
+        if pl and now < pl.request_after:
+            wait = int(pl.request_after - now)
             if wait < 0: wait = 0
-            return await context.bot.send_message(user_id, f"⏳ Wait {wait}s, then REQUEST again.")
-
-        if len(link_pool) == 0:
-            return await context.bot.send_message(user_id, "⏳ No links! Owner/Admin bheje!")
-
-        # if old link active and user requests after cooldown: mark done
-        if pl:
-            st["copied"] += 1
-            get_sender_stats(pl.by_id, pl.by_name)["copied"] += 1
-
-            append_daily_row(
-                name, user_id, pl.url, "done",
-                done_time=now_str(),
-                note="Requested new after cooldown",
-                by_name=pl.by_name,
-                by_id=pl.by_id
-            )
-            pending_by_user.pop(user_id, None)
+            return await send_employee_panel(user_id, notice=f"⏳ Wait {wait}s, then REQUEST again.")
 
-        item = link_pool.pop(0)
-        await assign_link_to_user(context, user_id, item)
+        if not await request_next_link(user_id):
+            pos = waitlist.add(user_id)
+            return await send_employee_panel(user_id, notice=f"⏳ No links! Queue me ho: #{pos}")
         return
 
     # COPY LINK
     if data == "copy_link":
-        if not pl:
-            return await context.bot.send_message(user_id, "⚠️ No active link!")
-
-        st["copied"] += 1
-        get_sender_stats(pl.by_id, pl.by_name)["copied"] += 1
-
-        append_daily_row(
-            name, user_id, pl.url, "done",
-            done_time=now_str(),
-            note="Copied ✅",
-            by_name=pl.by_name,
-            by_id=pl.by_id
-        )
-
-        pending_by_user.pop(user_id, None)
+        if not pl or not await transition(state.finish, user_id, "done", expect=pl):
+            return await send_employee_panel(user_id, notice="⚠️ No active link!")
 
-        await query.edit_message_text(
-            f"✅ LINK COPIED!
-<code>{pl.url}</code>
+        mark_done(user_id, pl, "Copied ✅")
+        st = get_stats(user_id)
 
-"
-            f"By: {pl.by_name}
-"
-            f"💚 Total: {st['copied']}/{MAX_LINKS_PER_USER}
-"
+        copied_notice = (
+            f"✅ LINK COPIED!\n<code>{pl.url}</code>\n"
+            f"By: {pl.by_name}\n"
+            f"💚 Total: {st['copied']}/{MAX_LINKS_PER_USER}\n"
             f"➡️ 1 minute baad REQUEST available hoga."
         )
 
         # notify owner + sender
-        await context.bot.send_message(OWNER_ID, f"📋 COPIED: {name}
-By: {pl.by_name}
-{pl.url}")
+        notify_owner("copy", f"📋 COPIED: {name}\nBy: {pl.by_name}\n{pl.url}")
         if pl.by_id != OWNER_ID:
-            await notify_sender(
-                context,
+            notify_sender(
+                "copy",
                 pl.by_id,
-                f"✅ COPIED by {name} (ID {user_id})
-"
-                f"Employee total copied: {st['copied']}/{MAX_LINKS_PER_USER}
-"
+                f"✅ COPIED by {name} (ID {user_id})\n"
+                f"Employee total copied: {st['copied']}/{MAX_LINKS_PER_USER}\n"
                 f"{pl.url}"
             )
 
-        await send_employee_panel(context, user_id)
+        await send_employee_panel(user_id, notice=copied_notice)
         return
 
     # CANCEL (5 min)
     if data == "cancel_link":
-        if not pl or datetime.now() > pl.actions_until:
-            return await context.bot.send_message(user_id, "❌ Cancel time out!")
+        if not pl or now_ts() > pl.actions_until:
+            return await send_employee_panel(user_id, notice="❌ Cancel time out!")
+        if not await transition(state.finish, user_id, "cancel", expect=pl):
+            return await send_employee_panel(user_id, notice="⚠️ No active link!")
 
-        st["cancelled"] += 1
-        get_sender_stats(pl.by_id, pl.by_name)["cancelled"] += 1
+        expiry.cancel(user_id)
+        st = get_stats(user_id)
 
         append_daily_row(
             name, user_id, pl.url, "cancelled",
@@ -738,36 +1132,31 @@ By: {pl.by_name}
             by_id=pl.by_id
         )
 
-        # return to pool
-        link_pool.append({"url": pl.url, "by_id": pl.by_id, "by_name": pl.by_name})
-        pending_by_user.pop(user_id, None)
+        # already back in the pool
+        kick_waitlist()
 
-        await context.bot.send_message(user_id, f"❌ Cancelled. Link pool me wapas.
-By: {pl.by_name}")
-        await context.bot.send_message(OWNER_ID, f"🔁 CANCEL: {name}
-By: {pl.by_name}
-{pl.url}")
+        notify_owner("cancel", f"🔁 CANCEL: {name}\nBy: {pl.by_name}\n{pl.url}")
         if pl.by_id != OWNER_ID:
-            await notify_sender(
-                context,
+            notify_sender(
+                "cancel",
                 pl.by_id,
-                f"🔁 CANCELLED by {name} (ID {user_id})
-"
-                f"Employee total taken: {st['sent']}/{MAX_LINKS_PER_USER}
-"
+                f"🔁 CANCELLED by {name} (ID {user_id})\n"
+                f"Employee total taken: {st['sent']}/{MAX_LINKS_PER_USER}\n"
                 f"{pl.url}"
             )
 
-        await send_employee_panel(context, user_id)
+        await send_employee_panel(user_id, notice=f"❌ Cancelled. Link pool me wapas.\nBy: {pl.by_name}")
         return
 
     # EXPIRE/REMOVE manually (5 min) -> not returned to pool
     if data == "expire_manual":
-        if not pl or datetime.now() > pl.actions_until:
-            return await context.bot.send_message(user_id, "❌ Expire time out!")
+        if not pl or now_ts() > pl.actions_until:
+            return await send_employee_panel(user_id, notice="❌ Expire time out!")
+        if not await transition(state.finish, user_id, "remove", expect=pl):
+            return await send_employee_panel(user_id, notice="⚠️ No active link!")
 
-        st["expired"] += 1
-        get_sender_stats(pl.by_id, pl.by_name)["expired"] += 1
+        expiry.cancel(user_id)
+        st = get_stats(user_id)
 
         append_daily_row(
             name, user_id, pl.url, "expired",
@@ -780,51 +1169,276 @@ By: {pl.by_name}
         removed_url = pl.url
         by_name = pl.by_name
         by_id = pl.by_id
-        pending_by_user.pop(user_id, None)
 
-        await context.bot.send_message(user_id, f"🗑 Removed/Expired.
-By: {by_name}")
-        await context.bot.send_message(OWNER_ID, f"🗑 EXPIRE: {name}
-By: {by_name}
-{removed_url}")
+        notify_owner("remove", f"🗑 EXPIRE: {name}\nBy: {by_name}\n{removed_url}")
         if by_id != OWNER_ID:
-            await notify_sender(
-                context,
+            notify_sender(
+                "remove",
                 by_id,
-                f"🗑 EXPIRED/REMOVED by {name} (ID {user_id})
-"
-                f"Employee total taken: {st['sent']}/{MAX_LINKS_PER_USER}
-"
+                f"🗑 EXPIRED/REMOVED by {name} (ID {user_id})\n"
+                f"Employee total taken: {st['sent']}/{MAX_LINKS_PER_USER}\n"
                 f"{removed_url}"
             )
 
-        await send_employee_panel(context, user_id)
+        await send_employee_panel(user_id, notice=f"🗑 Removed/Expired.\nBy: {by_name}")
         return
 
+# =========================
+# Perf (/perf + Prometheus export)
+# =========================
+metrics.describe("handler_seconds", "Update handler latency incl. replies")
+metrics.describe("action_seconds", "Callback button latency per action (after answer, incl. per-user lock wait)")
+metrics.describe("api_seconds", "Telegram Bot API call latency per method")
+metrics.describe("outbox_wait_seconds", "Time from outbox submit to send attempt (rate limits, backlog)")
+metrics.describe("disk_seconds", "Disk operation latency (storage pool incl. queue wait, writer thread, journal, sqlite)")
+metrics.gauge("pool_links", lambda: state.queued(), "Links waiting in the pool")
+metrics.gauge("pending_assignments", lambda: state.pending_count(), "Links currently assigned to employees")
+metrics.gauge("waitlist_users", lambda: len(waitlist), "Employees waiting for a link")
+metrics.gauge("outbox", outbox.stats, "Outbox queue/inflight and sent/dropped/retries totals")
+metrics.gauge("daily_writer", lambda: {"queued": daily_writer.queue_depth, "rows": daily_writer.rows_written,
+                                       "flushes": daily_writer.flushes, "errors": daily_writer.errors,
+                                       "dropped": daily_writer.rows_dropped},
+              "Daily sheet writer queue depth and totals")
+metrics.gauge("timers", lambda: {"expiry": len(expiry), "panel_flips": len(panel_flips),
+                                 "expiry_running": expiry.running_batches},
+              "Armed timers, expiry batches in flight")
+metrics.gauge("roster_cache", lambda: {f"{roster}_{k}": v for roster, st in roster_cache_stats().items()
+                                        for k, v in st.items()},
+              "Employees/admins CSV cache hits, misses (re-reads) and size")
+metrics.gauge("user_locks", lambda: len(user_locks), "Per-user locks in use")
+metrics.gauge("process_io", process_io, "Process I/O from /proc/self/io (syscalls, bytes)")
+metrics.gauge("done_index", lambda: {"urls": len(done_index), "bytes": done_index.nbytes},
+              "Done-URL history index size")
+metrics.gauge("uptime_seconds", lambda: time.time() - metrics.started, "Seconds since start or last /perf reset")
+
+def perf_report() -> str:
+    up = time.time() - metrics.started
+    lines = [f"📈 PERF (last {up / 60:.0f} min, p50/p99 = bucket upper bound)"]
+    for title, name, label in (("⚙️ Handlers", "handler_seconds", "handler"),
+                               ("🔘 Buttons", "action_seconds", "action"),
+                               ("📡 Bot API", "api_seconds", "method"),
+                               ("💾 Disk", "disk_seconds", "op"),
+                               ("📤 Outbox wait", "outbox_wait_seconds", "method"),
+                               ("⏱ Timers", "timer_seconds", "timer"),
+                               ("🔁 Jobs", "job_seconds", "job")):
+        rows = metrics.table(name, label, PERF_TOP)
+        if rows:
+            lines.append(f"\n{title}")
+            lines.extend(rows)
+    errs = {**metrics.counter_values("handler_errors_total", "handler"),
+            **metrics.counter_values("api_errors_total", "method"),
+            **{f"gauge {k}": v for k, v in metrics.counter_values("gauge_errors_total", "gauge").items()}}
+    if errs:
+        lines.append("\n❌ Errors: " + ", ".join(f"{k} {v:g}" for k, v in sorted(errs.items())))
+
+    io = process_io()
+    if io:
+        lines.append(f"\n💽 Process I/O: {io['syscw']:.0f} writes / {io['wchar'] / 1e6:.1f} MB, "
+                     f"{io['syscr']:.0f} reads / {io['rchar'] / 1e6:.1f} MB")
+    ob = outbox.stats()
+    rosters = " | ".join(f"{r} {st['hits']} hits / {st['misses']} misses" for r, st in roster_cache_stats().items())
+    lines.append(
+        f"📦 Pool {state.queued()} | ⏳ Pending {state.pending_count()} | 🕒 Waitlist {len(waitlist)}\n"
+        f"📤 Outbox {ob['queued']} queued, {ob['inflight']} inflight | sent {ob['sent']}, "
+        f"dropped {ob['dropped']}, retries {ob['retries']}\n"
+        f"📝 Sheet writer queue {daily_writer.queue_depth}\n"
+        f"👥 Roster cache {rosters}\n"
+        f"📚 Done index {len(done_index)} URLs, {done_index.nbytes / 1e6:.1f} MB | "
+        f"rejected {sum(metrics.counter_values('links_rejected_total', 'reason').values()):g}"
+    )
+    return "\n".join(lines)
+
+async def perf_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not is_owner(update.effective_user.id):
+        return await reply(update, "❌ Owner only!")
+    if context.args and context.args[0].lower() == "reset":
+        metrics.reset()
+        return await reply(update, "✅ Perf counters reset")
+    text = perf_report()
+    for i in range(0, len(text), 4000):
+        await reply(update, text[i:i + 4000])
+
+# on-demand only: no sampler thread exists unless /profile is running
+profiler = StackSampler(PROFILE_INTERVAL)
+profile_task: asyncio.Task | None = None
+PROFILE_USAGE = f"Usage: /profile [seconds]  (default {PROFILE_DEFAULT_SECONDS}, max {PROFILE_MAX_SECONDS})"
+
+async def profile_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    global profile_task
+    if not is_owner(update.effective_user.id):
+        return await reply(update, "❌ Owner only!")
+    try:
+        seconds = int(context.args[0]) if context.args else PROFILE_DEFAULT_SECONDS
+    except ValueError:
+        return await reply(update, PROFILE_USAGE)
+    if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+        return await reply(update, PROFILE_USAGE)
+    if profiler.running:
+        return await reply(update, "⚠️ Profile already running")
+
+    profiler.start()
+    await reply(update, f"🔬 Profiling {seconds}s... result yahin aayega")
+    # don't hold an update slot for the whole capture
+    profile_task = asyncio.create_task(finish_profile(update.effective_user.id, seconds))
+
+async def finish_profile(chat_id: int, seconds: int):
+    global profile_task
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        await run_io(profiler.stop)
+        profile_task = None
+    try:
+        text = profiler.report(PROFILE_TOP)
+        for i in range(0, len(text), 4000):
+            await outbox.send(chat_id, text[i:i + 4000])
+        await outbox.submit(
+            "send_document", chat_id,
+            document=profiler.collapsed().encode("utf-8"),
+            filename=collapsed_filename(),
+            caption="🔥 collapsed stacks: flamegraph.pl / speedscope.app",
+        )
+    except Exception as e:
+        print(f"❌ Profile report failed: {e}")
+
+async def perf_export_job(context: ContextTypes.DEFAULT_TYPE):
+    # gauges read the backend (sqlite connection is bound to this thread) -> render here, write in run_io
+    # atomic replace: node_exporter textfile collector never reads a half file
+    await run_io(write_text_atomic, PERF_PROM_FILE, metrics.render(), suffix=".prom")
+
 # =========================
 # Main
 # =========================
+async def digest_job(context: ContextTypes.DEFAULT_TYPE):
+    digests.flush_due()
+
+async def refresh_rosters_job(context: ContextTypes.DEFAULT_TYPE):
+    await run_io(refresh_rosters)
+
+async def expiry_sweep_job(context: ContextTypes.DEFAULT_TYPE):
+    # shared backend: assignments made by other (or crashed) workers have no timer here;
+    # whoever sweeps first expires them, finish() makes sure only once
+    await expire_due(state.due(time.time()))
+    # links may have come in through another worker
+    kick_waitlist()
+
+async def journal_compact_job(context: ContextTypes.DEFAULT_TYPE):
+    # snapshot dict here on the loop (whole transitions only), JSON + fsync in a storage thread
+    if state.compact_due():
+        await run_io(state.end_compact, state.begin_compact())
+
+async def done_index_job(context: ContextTypes.DEFAULT_TYPE):
+    await run_io(done_index.sync, DATA_DIR)
+
+metrics_server = None
+
+async def on_startup(app: Application):
+    global metrics_server
+    outbox.start(app.bot)
+    expiry.start()
+    panel_flips.start()
+    if PERF_HTTP_PORT:
+        metrics_server = await start_metrics_server(PERF_HTTP_LISTEN, PERF_HTTP_PORT)
+        print(f"📈 Metrics on http://{PERF_HTTP_LISTEN}:{PERF_HTTP_PORT}/metrics")
+
+async def on_shutdown(app: Application):
+    if metrics_server is not None:
+        metrics_server.close()
+    profiler.stop()
+    await expiry.stop()
+    await panel_flips.stop()
+    digests.flush_due(force=True)
+    await outbox.stop()
+    daily_writer.close()
+    done_index.sync(DATA_DIR)
+    state.close()
+    shutdown_io()
+
+def register_jobs(job_queue):
+    def every(job, seconds: float):
+        job_queue.run_repeating(metrics.wrap(job, "job"), interval=seconds, first=seconds)
+
+    every(digest_job, DIGEST_TICK_SECONDS)
+    if LIVE_PANEL_SECONDS > 0:
+        every(live_panel_job, LIVE_PANEL_SECONDS)
+    every(refresh_rosters_job, ROSTER_REFRESH_SECONDS)
+    if state.shared:
+        every(expiry_sweep_job, EXPIRY_SWEEP_SECONDS)
+    else:
+        every(journal_compact_job, JOURNAL_COMPACT_CHECK_SECONDS)
+    if PERF_PROM_FILE:
+        every(perf_export_job, PERF_EXPORT_SECONDS)
+    every(done_index_job, DONE_INDEX_SYNC_SECONDS)
+
 def main():
     ensure_daily_csv()
     ensure_employees_csv()
     ensure_admins_csv()
+    refresh_rosters()
+    load_digest_configs()
+
+    t0 = time.perf_counter()
+    state.restore()
+    print(
+        f"💾 State ({STATE_BACKEND}) restored in {(time.perf_counter() - t0) * 1000:.0f}ms: "
+        f"pool {state.queued()}, pending {state.pending_count()}"
+    )
+    t0 = time.perf_counter()
+    done_index.load()
+    n = done_index.sync(DATA_DIR)
+    print(
+        f"📚 Done index: {len(done_index)} URLs, {done_index.nbytes / 1e6:.1f} MB "
+        f"(+{n} from sheets) in {(time.perf_counter() - t0) * 1000:.0f}ms"
+    )
+    daily_writer.start()
     print("🚀 Bot ready! Owner+Admins with contributor tracking")
 
-    app = Application.builder().token(BOT_TOKEN).build()
-
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("adminamit", admin_request))
-    app.add_handler(CommandHandler("adminlist", admin_list))
-
-    app.add_handler(CommandHandler("totallinksend", totallinksend))   # employee stats
-    app.add_handler(CommandHandler("contributors", contributors))     # owner/admin stats
-    app.add_handler(CommandHandler("remove", remove_employee))
-    app.add_handler(CommandHandler("sheet", sheet_cmd))
-
-    app.add_handler(CallbackQueryHandler(callbacks))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, owner_link_message))
-
-    app.run_polling(drop_pending_updates=True)
+    app = (Application.builder().token(BOT_TOKEN).post_init(on_startup).post_shutdown(on_shutdown)
+           .concurrent_updates(CONCURRENT_UPDATES).request(TimedRequest(connection_pool_size=256)).build())
+
+    register_jobs(app.job_queue)
+
+    # re-arm expiry timers of in-flight assignments
+    for uid in state.pending_users():
+        expiry.schedule(uid, state.get(uid).expiry_time)
+        schedule_panel_flip(uid)
+
+    app.add_handler(CommandHandler("start", metrics.wrap(start)))
+    app.add_handler(CommandHandler("adminamit", metrics.wrap(admin_request)))
+    app.add_handler(CommandHandler("adminlist", metrics.wrap(admin_list)))
+
+    app.add_handler(CommandHandler("totallinksend", metrics.wrap(totallinksend)))   # employee stats
+    app.add_handler(CommandHandler("contributors", metrics.wrap(contributors)))     # owner/admin stats
+    app.add_handler(CommandHandler("remove", metrics.wrap(remove_employee)))
+    app.add_handler(CommandHandler("sheet", metrics.wrap(sheet_cmd)))
+    app.add_handler(CommandHandler("analytics", metrics.wrap(analytics_cmd)))
+    app.add_handler(CommandHandler("digest", metrics.wrap(digest_cmd)))
+    app.add_handler(CommandHandler("backlog", metrics.wrap(backlog_cmd)))
+    app.add_handler(CommandHandler("poolmode", metrics.wrap(poolmode_cmd)))
+    app.add_handler(CommandHandler("perf", metrics.wrap(perf_cmd)))
+    app.add_handler(CommandHandler("profile", metrics.wrap(profile_cmd)))
+
+    app.add_handler(CallbackQueryHandler(metrics.wrap(callbacks)))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, metrics.wrap(owner_link_message)))
+    app.add_handler(MessageHandler(
+        filters.Document.FileExtension("txt") | filters.Document.FileExtension("csv"),
+        metrics.wrap(owner_document_message),
+    ))
+
+    if WEBHOOK_URL:
+        # Telegram restart ke dauran updates hold karke rakhta hai -> drop nahi karte
+        print(f"🌐 Webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}")
+        app.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=False,
+        )
+    else:
+        app.run_polling(drop_pending_updates=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,212 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import timedelta
+from typing import Any
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+from perf import metrics
+
+# =========================
+# Outbound message queue
+# saare bot messages (callback answers chhod ke) yahan se jaate hain: global + per-chat rate limit,
+# RetryAfter / network error pe backoff ke saath retry
+# =========================
+PRIO_EMPLOYEE = 0     # employee-facing (panel, replies) -> sabse pehle
+PRIO_OWNER = 1        # owner notifications
+PRIO_SENDER = 2       # contributor (admin) notifications
+PRIO_LIVE = 3         # live panel countdown edits (best effort)
+
+class _Job:
+    __slots__ = ("method", "chat_id", "kwargs", "priority", "future", "attempts", "queued_at")
+
+    def __init__(self, method: str, chat_id: int, kwargs: dict, priority: int, future: asyncio.Future):
+        self.method = method
+        self.chat_id = chat_id
+        self.kwargs = kwargs
+        self.priority = priority
+        self.future = future
+        self.attempts = 0
+        self.queued_at = time.monotonic()
+
+def _consume(fut: asyncio.Future):
+    # fire-and-forget jobs: don't warn about never-retrieved exceptions
+    if not fut.cancelled():
+        fut.exception()
+
+class Outbox:
+    def __init__(self, global_rate: float = 25.0, chat_rate: float = 1.0, chat_burst: int = 3,
+                 max_retries: int = 5, max_queue: int = 20000, concurrency: int = 8):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_queue = max_queue
+        self.concurrency = concurrency
+
+        self.bot = None
+        self._heap: list[tuple[int, int, _Job]] = []          # (priority, seq, job)
+        self._delayed: list[tuple[float, int, _Job]] = []     # (ready_at, seq, job)
+        self._seq = itertools.count()
+        self._chat_bucket: dict[int, tuple[float, float]] = {}  # chat -> (tokens, last)
+        self._next_send = 0.0
+        self._paused_until = 0.0
+        self._wake = asyncio.Event()
+        self._slots: asyncio.Semaphore | None = None
+        self._task: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+        self.sent = 0
+        self.dropped = 0
+        self.retries = 0
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._heap) + len(self._delayed)
+
+    def stats(self) -> dict[str, int]:
+        return {"queued": self.queue_length, "inflight": len(self._inflight),
+                "sent": self.sent, "dropped": self.dropped, "retries": self.retries}
+
+    # ---- public API ----
+    def submit(self, method: str, chat_id: int, priority: int = PRIO_EMPLOYEE, **kwargs) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        if self.queue_length >= self.max_queue:
+            self.dropped += 1
+            fut.set_result(None)
+            return fut
+        job = _Job(method, chat_id, kwargs, priority, fut)
+        heapq.heappush(self._heap, (priority, next(self._seq), job))
+        self._wake.set()
+        return fut
+
+    async def send(self, chat_id: int, text: str, priority: int = PRIO_EMPLOYEE, **kwargs) -> Any:
+        # wait until delivered (backpressure for the caller); raises on permanent failure
+        return await self.submit("send_message", chat_id, priority, text=text, **kwargs)
+
+    def fire(self, method: str, chat_id: int, priority: int, **kwargs) -> asyncio.Future:
+        # fire-and-forget, any bot method
+        fut = self.submit(method, chat_id, priority, **kwargs)
+        fut.add_done_callback(_consume)
+        return fut
+
+    def post(self, chat_id: int, text: str, priority: int = PRIO_OWNER, **kwargs) -> asyncio.Future:
+        return self.fire("send_message", chat_id, priority, text=text, **kwargs)
+
+    def start(self, bot):
+        self.bot = bot
+        self._slots = asyncio.Semaphore(self.concurrency)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        # drain what we can, then stop the worker
+        deadline = time.monotonic() + timeout
+        while (self.queue_length or self._inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---- rate limiting ----
+    def _chat_tokens(self, chat_id: int, now: float) -> float:
+        tokens, last = self._chat_bucket.get(chat_id, (float(self.chat_burst), now))
+        return min(float(self.chat_burst), tokens + (now - last) * self.chat_rate)
+
+    def _chat_ready_at(self, chat_id: int, now: float) -> float:
+        tokens = self._chat_tokens(chat_id, now)
+        if tokens >= 1.0:
+            return now
+        return now + (1.0 - tokens) / self.chat_rate
+
+    def _take(self, chat_id: int, now: float):
+        self._chat_bucket[chat_id] = (self._chat_tokens(chat_id, now) - 1.0, now)
+        self._next_send = now + 1.0 / self.global_rate
+
+    # ---- worker ----
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, job = heapq.heappop(self._delayed)
+                heapq.heappush(self._heap, (job.priority, next(self._seq), job))
+
+            wait: float | None = None
+            if now < self._paused_until:
+                wait = self._paused_until - now
+            elif self._heap:
+                prio, seq, job = heapq.heappop(self._heap)
+                ready = self._chat_ready_at(job.chat_id, now)
+                if ready > now:
+                    # this chat is over its limit -> park it, others go first
+                    heapq.heappush(self._delayed, (ready, seq, job))
+                    continue
+                if self._next_send > now:
+                    heapq.heappush(self._heap, (prio, seq, job))
+                    wait = self._next_send - now
+                else:
+                    self._take(job.chat_id, now)
+                    await self._slots.acquire()
+                    metrics.observe("outbox_wait_seconds", time.monotonic() - job.queued_at, method=job.method)
+                    t = asyncio.create_task(self._send(job))
+                    self._inflight.add(t)
+                    t.add_done_callback(self._inflight.discard)
+                    continue
+
+            if self._delayed:
+                d = self._delayed[0][0] - now
+                wait = d if wait is None else min(wait, d)
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _retry_later(self, job: _Job, delay: float):
+        heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), job))
+
+    async def _send(self, job: _Job):
+        try:
+            res = await getattr(self.bot, job.method)(chat_id=job.chat_id, **job.kwargs)
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(res)
+        except RetryAfter as e:
+            ra = e.retry_after
+            delay = ra.total_seconds() if isinstance(ra, timedelta) else float(ra)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._requeue(job, e, delay)
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                # edit with identical text/keyboard -> nothing to do
+                if not job.future.done():
+                    job.future.set_result(True)
+            else:
+                self._drop(job, e)
+        except (TimedOut, NetworkError) as e:
+            self._requeue(job, e, min(30.0, 0.5 * 2 ** job.attempts))
+        except Exception as e:
+            self._drop(job, e)
+        finally:
+            self._slots.release()
+            self._wake.set()
+
+    def _requeue(self, job: _Job, err: Exception, delay: float):
+        job.attempts += 1
+        if job.attempts > self.max_retries:
+            return self._drop(job, err)
+        self.retries += 1
+        self._retry_later(job, delay)
+
+    def _drop(self, job: _Job, err: Exception):
+        self.dropped += 1
+        print(f"⚠️ Outbox drop {job.method} → {job.chat_id}: {err}")
+        if not job.future.done():
+            job.future.set_exception(err)
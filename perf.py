@@ -0,0 +1,255 @@
+import asyncio
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from telegram.request import HTTPXRequest
+
+# =========================
+# Built-in instrumentation
+# latency histograms (handlers, callback actions, Bot API methods, disk ops),
+# counters aur gauges; /perf ke liye summary + Prometheus text format
+# =========================
+# seconds; Prometheus style cumulative "le" buckets (+Inf implicit)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        # upper bound of the bucket holding the q-th observation (capped at max)
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+def _labels(labels: dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _fmt_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt_le(le: float) -> str:
+    return repr(le) if le != int(le) else f"{le:.1f}"
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if v == int(v) else repr(v)
+
+def _le_label(le: str) -> str:
+    return 'le="' + le + '"'
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()      # disk ops are observed from storage/writer threads
+        self.hists: dict[str, dict[Labels, Histogram]] = {}
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self.gauges: dict[str, Callable[[], float | dict[str, float]]] = {}
+        self.help: dict[str, str] = {}
+        self.started = time.time()
+        self._gauge_failed: set[str] = set()
+
+    # ---- recording ----
+    def observe(self, name: str, seconds: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            h = self.hists.setdefault(name, {}).get(key)
+            if h is None:
+                h = self.hists[name][key] = Histogram()
+            h.observe(seconds)
+
+    def inc(self, name: str, n: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            c = self.counters.setdefault(name, {})
+            c[key] = c.get(key, 0) + n
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t, **labels)
+
+    def gauge(self, name: str, fn: Callable[[], float | dict[str, float]], help: str = ""):
+        # fn() -> value, or {label_value: value} (label name = "kind")
+        self.gauges[name] = fn
+        if help:
+            self.help[name] = help
+
+    def describe(self, name: str, help: str):
+        self.help[name] = help
+
+    def reset(self):
+        with self._lock:
+            self.hists.clear()
+            self.counters.clear()
+            self.started = time.time()
+
+    def wrap(self, fn: Callable, kind: str = "handler", name: str | None = None) -> Callable:
+        # async callback -> {kind}_seconds{kind=name} + {kind}_errors_total
+        # (handlers: (update, context), jobs: (context), timers: (keys))
+        label = name or fn.__name__
+        metric, errors = f"{kind}_seconds", f"{kind}_errors_total"
+
+        @functools.wraps(fn)
+        async def wrapped(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                self.inc(errors, **{kind: label})
+                raise
+            finally:
+                self.observe(metric, time.perf_counter() - t, **{kind: label})
+        return wrapped
+
+    # ---- export ----
+    def _gauge_values(self) -> dict[str, dict[Labels, float]]:
+        # gauges read live state (backend, outbox, ...) -> call from the event loop thread
+        out: dict[str, dict[Labels, float]] = {}
+        for name, fn in self.gauges.items():
+            try:
+                v = fn()
+            except Exception as e:
+                self.inc("gauge_errors_total", gauge=name)
+                if name not in self._gauge_failed:
+                    self._gauge_failed.add(name)
+                    print(f"⚠️ Gauge {name} failed: {type(e).__name__}: {e}")
+                continue
+            if isinstance(v, dict):
+                out[name] = {(("kind", str(k)),): float(x) for k, x in v.items()}
+            else:
+                out[name] = {(): float(v)}
+        return out
+
+    def render(self, prefix: str = "linkbot_") -> str:
+        # Prometheus text exposition format 0.0.4
+        lines: list[str] = []
+        with self._lock:
+            hists = {n: {k: (list(h.counts), h.count, h.sum) for k, h in s.items()} for n, s in self.hists.items()}
+            counters = {n: dict(s) for n, s in self.counters.items()}
+
+        def head(name: str, kind: str):
+            if name in self.help:
+                lines.append(f"# HELP {prefix}{name} {self.help[name]}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        for name in sorted(hists):
+            head(name, "histogram")
+            for key, (counts, count, total) in sorted(hists[name].items()):
+                seen = 0
+                for le, n in zip(BUCKETS, counts):
+                    seen += n
+                    lines.append(f"{prefix}{name}_bucket{_fmt_labels(key, _le_label(_fmt_le(le)))} {seen}")
+                lines.append(f"{prefix}{name}_bucket{_fmt_labels(key, _le_label('+Inf'))} {count}")
+                lines.append(f"{prefix}{name}_sum{_fmt_labels(key)} {total:.6f}")
+                lines.append(f"{prefix}{name}_count{_fmt_labels(key)} {count}")
+        for name in sorted(counters):
+            head(name, "counter")
+            for key, v in sorted(counters[name].items()):
+                lines.append(f"{prefix}{name}{_fmt_labels(key)} {_fmt_value(v)}")
+        for name, series in sorted(self._gauge_values().items()):
+            head(name, "gauge")
+            for key, v in sorted(series.items()):
+                lines.append(f"{prefix}{name}{_fmt_labels(key)} {_fmt_value(v)}")
+        return "\n".join(lines) + "\n"
+
+    def table(self, name: str, label: str, top: int = 10) -> list[str]:
+        # "label  n  p50  p99  max  total" rows, slowest total first
+        with self._lock:
+            rows = [(dict(k).get(label, "-"), h.count, h.quantile(0.5), h.quantile(0.99), h.max, h.sum)
+                    for k, h in self.hists.get(name, {}).items()]
+        rows.sort(key=lambda r: -r[5])
+        return [f"{lbl}: {n} | p50 {p50 * 1000:.1f} | p99 {p99 * 1000:.1f} | max {mx * 1000:.1f} ms"
+                for lbl, n, p50, p99, mx, _ in rows[:top]]
+
+    def counter_values(self, name: str, label: str) -> dict[str, float]:
+        # summed over the other labels (api_errors_total: every error type of a method)
+        out: dict[str, float] = {}
+        with self._lock:
+            for k, v in self.counters.get(name, {}).items():
+                key = dict(k).get(label, "-")
+                out[key] = out.get(key, 0) + v
+        return out
+
+metrics = Metrics()
+
+# =========================
+# Process disk I/O (Linux /proc/self/io)
+# =========================
+def process_io() -> dict[str, float]:
+    # read/write syscalls + bytes (rchar/wchar incl. page cache, *_bytes = real storage)
+    try:
+        with open("/proc/self/io", "r") as f:
+            raw = dict(line.split(": ") for line in f.read().splitlines())
+        return {k: float(raw[k]) for k in ("syscr", "syscw", "rchar", "wchar", "read_bytes", "write_bytes")}
+    except (OSError, KeyError, ValueError):
+        return {}
+
+# =========================
+# Bot API timing
+# har HTTP call (send_message, edit_message_text, answer_callback_query, ...) yahin se jaata hai
+# =========================
+class TimedRequest(HTTPXRequest):
+    async def post(self, url: str, *args, **kwargs):
+        method = url.rsplit("/", 1)[-1]
+        t = time.perf_counter()
+        try:
+            return await super().post(url, *args, **kwargs)
+        except Exception as e:
+            metrics.inc("api_errors_total", method=method, error=type(e).__name__)
+            raise
+        finally:
+            metrics.observe("api_seconds", time.perf_counter() - t, method=method)
+
+# =========================
+# Local /metrics HTTP endpoint (optional)
+# =========================
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        req = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = req.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/metrics", "/"):
+            body = metrics.render().encode("utf-8")
+            head = "HTTP/1.1 200 OK\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+        else:
+            body = b"not found\n"
+            head = "HTTP/1.1 404 Not Found\r\nContent-Type: text/plain\r\n"
+        writer.write(f"{head}Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    return await asyncio.start_server(_serve_metrics, host, port)
@@ -0,0 +1,243 @@
+import heapq
+import itertools
+import sys
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Iterator
+
+# =========================
+# Compact records
+# ek admin ke 100k links ek hi Contributor object share karte hain (interned),
+# pool item sirf (url, contributor, queue seq) -- dict ki jagah __slots__
+# =========================
+@dataclass(frozen=True, slots=True)
+class Contributor:
+    by_id: int
+    by_name: str
+
+_contributors: dict[tuple[int, str], Contributor] = {}
+
+def contributor(by_id: int, by_name: str) -> Contributor:
+    # same (id, name) -> same object; a renamed admin gets a new one from then on
+    key = (int(by_id), str(by_name))
+    c = _contributors.get(key)
+    if c is None:
+        c = _contributors[key] = Contributor(key[0], sys.intern(key[1]))
+    return c
+
+@dataclass(frozen=True, slots=True)
+class LinkItem:
+    url: str
+    by: Contributor
+    seq: int = 0          # position in the pool (global insertion order)
+
+    @property
+    def by_id(self) -> int:
+        return self.by.by_id
+
+    @property
+    def by_name(self) -> str:
+        return self.by.by_name
+
+    def to_dict(self) -> dict:
+        return {"url": self.url, "by_id": self.by.by_id, "by_name": self.by.by_name}
+
+# =========================
+# Link Pool + URL index
+# each item: LinkItem(url, by=Contributor, seq)
+# har contributor (by_id) ki apni sub-queue; next link kaun dega ye mode decide karta hai:
+#   fifo - sabse purana link pehle (global oldest first)
+#   rr   - contributors me round-robin
+#   wfq  - weighted fair queuing (weights[by_id], default 1)
+# queued = pool me pada hai, out = kisi employee ko assigned hai
+# =========================
+POOL_MODES = ("fifo", "rr", "wfq")
+
+class LinkPool:
+    def __init__(self, mode: str = "fifo", weights: dict[int, float] | None = None):
+        if mode not in POOL_MODES:
+            raise ValueError(f"unknown pool mode: {mode}")
+        self.mode = mode
+        self.weights: dict[int, float] = dict(weights or {})
+
+        self._subq: dict[int, deque[LinkItem]] = {}
+        self._seq = itertools.count()
+        self._len = 0
+        self._queued: set[str] = set()
+        self._out: set[str] = set()
+
+        # selection state (only the one for the current mode is used)
+        self._heads: list[tuple[int, int]] = []            # fifo: (head seq, by_id)
+        self._ring: deque[int] = deque()                    # rr: active contributors
+        self._vheap: list[tuple[float, int, int]] = []     # wfq: (virtual time, tie, by_id)
+        self._vt: dict[int, float] = {}
+        self._vclock = 0.0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._queued or url in self._out
+
+    def __iter__(self) -> Iterator[LinkItem]:
+        # global insertion order (oldest first)
+        return heapq.merge(*self._subq.values(), key=lambda it: it.seq)
+
+    @property
+    def out_count(self) -> int:
+        return len(self._out)
+
+    # ---- internals ----
+    def _push(self, url: str, by: Contributor):
+        by_id = by.by_id
+        seq = next(self._seq)
+        q = self._subq.get(by_id)
+        if q is None:
+            q = self._subq[by_id] = deque()
+        q.append(LinkItem(url, by, seq))
+        self._queued.add(url)
+        self._len += 1
+        if len(q) == 1:
+            self._activate(by_id, seq)
+
+    def _activate(self, by_id: int, head_seq: int):
+        # contributor went from empty -> non-empty
+        if self.mode == "fifo":
+            heapq.heappush(self._heads, (head_seq, by_id))
+        elif self.mode == "rr":
+            self._ring.append(by_id)
+        else:
+            vt = max(self._vt.get(by_id, 0.0), self._vclock)
+            self._vt[by_id] = vt
+            heapq.heappush(self._vheap, (vt, head_seq, by_id))
+
+    def _next_contributor(self) -> int:
+        if self.mode == "fifo":
+            return heapq.heappop(self._heads)[1]
+        if self.mode == "rr":
+            return self._ring.popleft()
+        vt, _, by_id = heapq.heappop(self._vheap)
+        self._vclock = vt
+        self._vt[by_id] = vt + 1.0 / max(self.weights.get(by_id, 1.0), 1e-6)
+        return by_id
+
+    def _rebuild_selection(self):
+        self._heads, self._ring, self._vheap = [], deque(), []
+        self._vt, self._vclock = {}, 0.0
+        active = sorted((q[0].seq, by_id) for by_id, q in self._subq.items() if q)
+        for head_seq, by_id in active:
+            self._activate(by_id, head_seq)
+
+    # ---- public API ----
+    def set_mode(self, mode: str):
+        if mode not in POOL_MODES:
+            raise ValueError(f"unknown pool mode: {mode}")
+        self.mode = mode
+        self._rebuild_selection()
+
+    def set_weight(self, by_id: int, weight: float):
+        self.weights[by_id] = weight
+
+    def add(self, url: str, by: Contributor) -> bool:
+        # new link from owner/admin -> reject if already queued or assigned
+        if url in self:
+            return False
+        self._push(url, by)
+        return True
+
+    def pop(self) -> LinkItem | None:
+        if not self._len:
+            return None
+        by_id = self._next_contributor()
+        q = self._subq[by_id]
+        item = q.popleft()
+        if q:
+            if self.mode == "fifo":
+                heapq.heappush(self._heads, (q[0].seq, by_id))
+            elif self.mode == "rr":
+                self._ring.append(by_id)
+            else:
+                heapq.heappush(self._vheap, (self._vt[by_id], q[0].seq, by_id))
+        else:
+            del self._subq[by_id]
+        self._len -= 1
+        self._queued.discard(item.url)
+        self._out.add(item.url)
+        return item
+
+    def give_back(self, url: str, by: Contributor) -> bool:
+        # cancel / timer expire -> back to pool (no double copies)
+        self._out.discard(url)
+        if url in self._queued:
+            return False
+        self._push(url, by)
+        return True
+
+    def load(self, items: list[tuple[str, Contributor]], assigned: set[str]):
+        # restart recovery: replace contents in one go
+        self._subq = {}
+        self._len = 0
+        self._queued = set()
+        self._heads, self._ring, self._vheap = [], deque(), []
+        self._vt, self._vclock = {}, 0.0
+        for url, by in items:
+            self._push(url, by)
+        self._out = set(assigned)
+
+    def release(self, url: str):
+        # copied / manually removed -> link leaves the pool for good
+        self._out.discard(url)
+
+    def backlog(self) -> list[tuple[int, str, int]]:
+        # [(by_id, by_name, queued)] biggest first
+        rows = [(by_id, q[-1].by.by_name, len(q)) for by_id, q in self._subq.items() if q]
+        rows.sort(key=lambda r: -r[2])
+        return rows
+
+# =========================
+# Wait list (pool khali tha jab employee ne REQUEST kiya)
+# FIFO, ek employee ek hi baar
+# =========================
+class WaitList:
+    def __init__(self):
+        self._q: OrderedDict[int, None] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._q)
+
+    def __bool__(self) -> bool:
+        return bool(self._q)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._q
+
+    def add(self, user_id: int) -> int:
+        # returns 1-based queue position
+        if user_id not in self._q:
+            self._q[user_id] = None
+            return len(self._q)
+        return self.position(user_id)
+
+    def push_front(self, user_id: int):
+        # their turn came but couldn't be served -> head of the queue again
+        self._q[user_id] = None
+        self._q.move_to_end(user_id, last=False)
+
+    def remove(self, user_id: int):
+        self._q.pop(user_id, None)
+
+    def pop(self) -> int | None:
+        if not self._q:
+            return None
+        return self._q.popitem(last=False)[0]
+
+    def position(self, user_id: int) -> int | None:
+        if user_id not in self._q:
+            return None
+        for i, uid in enumerate(self._q, 1):
+            if uid == user_id:
+                return i
+        return None
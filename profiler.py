@@ -0,0 +1,120 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# =========================
+# On-demand sampling profiler (/profile)
+# ek background thread har INTERVAL pe sys._current_frames() se saare threads ke stacks leta hai;
+# band ho to koi thread nahi, koi hook nahi -> zero overhead
+# output: top functions (self / total) + collapsed stacks (flamegraph.pl, speedscope)
+# =========================
+MAX_DEPTH = 96
+# blocked waiting (event loop for updates/timers, idle worker threads) -> "idle", not hot code
+IDLE_LEAVES = ("select (selectors.py", "wait (threading.py", "_worker (thread.py")
+
+def _frame_label(code) -> str:
+    path = code.co_filename.replace("\\", "/")
+    # site-packages: "telegram/_bot.py"; stdlib / our modules: file name only
+    short = path.split("site-packages/", 1)[1] if "site-packages/" in path else os.path.basename(path)
+    return f"{code.co_name} ({short}:{code.co_firstlineno})".replace(";", ":")
+
+class StackSampler:
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter[tuple[str, ...]] = Counter()   # (thread, root, ..., leaf) -> samples
+        self.samples = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._labels: dict = {}       # code object -> label (cached, codes are long lived)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.stacks.clear()
+        self.samples = 0
+        self._stop.clear()
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed = time.monotonic() - self.started
+        self._labels.clear()
+
+    # ---- sampler thread ----
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(tid, f"thread-{tid}"))
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    # ---- reports ----
+    def collapsed(self) -> str:
+        # "thread;root;...;leaf count" per line
+        return "".join(f"{';'.join(s)} {n}\n" for s, n in self.stacks.most_common())
+
+    def top(self, n: int = 20, thread: str | None = None) -> tuple[list[tuple[str, int, int]], int, int]:
+        # [(function, self samples, total samples)], busy samples, idle samples
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        busy = idle = 0
+        for stack, c in self.stacks.items():
+            if thread is not None and stack[0] != thread:
+                continue
+            leaf = stack[-1]
+            if leaf.startswith(IDLE_LEAVES):
+                idle += c
+                continue
+            busy += c
+            own[leaf] += c
+            for fn in set(stack[1:]):
+                total[fn] += c
+        rows = [(fn, own[fn], total[fn]) for fn, _ in own.most_common(n)]
+        return rows, busy, idle
+
+    def report(self, n: int = 20, thread: str = "MainThread") -> str:
+        rows, busy, idle = self.top(n, thread)
+        seen = busy + idle
+        lines = [
+            f"🔬 PROFILE {self.elapsed:.0f}s | {self.samples} samples @ {self.interval * 1000:g}ms",
+            f"🧵 {thread}: busy {busy * 100 / max(seen, 1):.0f}% | idle {idle * 100 / max(seen, 1):.0f}%\n",
+            "self% total%  function",
+        ]
+        for fn, own, tot in rows:
+            lines.append(f"{own * 100 / max(busy, 1):5.1f} {tot * 100 / max(busy, 1):5.1f}  {fn}")
+        others = sorted({s[0] for s in self.stacks} - {thread})
+        if others:
+            lines.append("\n🧵 other threads: " + ", ".join(others))
+        return "\n".join(lines)
+
+def collapsed_filename(prefix: str = "profile") -> str:
+    return f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.collapsed.txt"
@@ -0,0 +1,98 @@
+import csv
+import os
+import threading
+import time
+from typing import Callable
+
+from perf import metrics
+
+# =========================
+# Roster cache (employees / admins CSV)
+# file ek baar parse hota hai, phir mtime/size badle tabhi reload
+# =========================
+class RosterCache:
+    def __init__(self, path: str, ensure: Callable[[], None], check_interval: float = 1.0):
+        self.path = path
+        self.ensure = ensure
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._data: dict[int, str] | None = None
+        self._sig: tuple[int, int] | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()     # refresh() on a storage thread vs put() from save_*
+        self._version = 0                 # bumped on every _data swap
+
+    def _signature(self) -> tuple[int, int] | None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _parse(self) -> dict[int, str]:
+        t = time.perf_counter()
+        self.ensure()
+        data: dict[int, str] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                r = csv.DictReader(f)
+                for row in r:
+                    if row.get("status", "active") == "active":
+                        data[int(row["telegram_id"])] = row["name"]
+        except:
+            pass
+        metrics.observe("disk_seconds", time.perf_counter() - t, op=f"parse {os.path.basename(self.path)}")
+        return data
+
+    def get(self) -> dict[int, str]:
+        now = time.monotonic()
+        if self._data is not None and now - self._checked_at < self.check_interval:
+            self.hits += 1
+            return self._data
+
+        if self.refresh():
+            self.misses += 1
+        else:
+            self.hits += 1
+        return self._data
+
+    def refresh(self) -> bool:
+        # stat the file, re-parse only if it changed; True if reloaded
+        # sig is taken BEFORE parsing: file replaced mid-parse -> next refresh sees a new sig
+        self._checked_at = time.monotonic()
+        sig = self._signature()
+        with self._lock:
+            if self._data is not None and sig is not None and sig == self._sig:
+                return False
+            version = self._version
+        data = self._parse()
+        with self._lock:
+            if self._version != version:
+                return False        # put()/another refresh swapped _data meanwhile -> that one is newer
+            self._version += 1
+            self._data, self._sig = data, sig
+        return True
+
+    def put(self, data: dict[int, str]):
+        # call after the file was rewritten by us -> no re-parse needed
+        data = dict(data)
+        with self._lock:
+            self._version += 1
+            self._data, self._sig = data, self._signature()
+            self._checked_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._data = None
+            self._sig = None
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.get()
+
+    def name(self, user_id: int, default: str = "") -> str:
+        return self.get().get(user_id, default)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data or {})}
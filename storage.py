@@ -0,0 +1,66 @@
+import asyncio
+import csv
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import IO, Any, Callable, Iterable, Iterator
+
+from perf import metrics
+
+# =========================
+# Async storage layer
+# blocking disk I/O ek chhote thread pool me, event loop free rehta hai
+# =========================
+STORAGE_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=STORAGE_WORKERS, thread_name_prefix="storage")
+
+async def run_io(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    # disk_seconds{op=fn} includes the wait for a free storage thread
+    loop = asyncio.get_running_loop()
+    with metrics.timer("disk_seconds", op=getattr(fn, "__name__", "io")):
+        return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
+
+def shutdown_io():
+    _executor.shutdown(wait=True)
+
+@contextmanager
+def atomic_open(path: str, mode: str = "w", suffix: str = ".tmp", fsync: bool = False) -> Iterator[IO]:
+    # unique temp file in same dir + rename -> readers never see a half-written file,
+    # aur do threads ek hi path likhein to bhi ek-doosre ki temp file nahi todte
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=suffix, dir=d)
+    try:
+        text = {} if "b" in mode else {"newline": "", "encoding": "utf-8"}
+        with os.fdopen(fd, mode, **text) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+def write_csv_atomic(path: str, header: list[str], rows: Iterable[list]):
+    with atomic_open(path, suffix=".csv", fsync=True) as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        w.writerows(rows)
+
+def write_text_atomic(path: str, text: str, suffix: str = ".tmp"):
+    with atomic_open(path, suffix=suffix) as f:
+        f.write(text)
+
+def read_bytes(path: str) -> bytes | None:
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator
+
+from perf import metrics
+
+# =========================
+# Durable state: append-only journal + compacted snapshot
+# har pool/assignment transition ek JSON line; snapshot me poora state + last seq
+# restart pe: snapshot load -> journal ke naye events replay
+# compaction do hisson me: snapshot dict + journal rotate (event loop pe, do transitions ke beech),
+# JSON dump + fsync + purane journals delete (storage thread me)
+# =========================
+class StateJournal:
+    def __init__(self, data_dir: str, snapshot_fn: Callable[[], Dict[str, Any]],
+                 compact_every: int = 20000, fsync: bool = False,
+                 encode: Callable[[Any], Any] | None = None):
+        self.journal_path = os.path.join(data_dir, "state.journal")
+        self.snapshot_path = os.path.join(data_dir, "state.snapshot.json")
+        self.snapshot_fn = snapshot_fn
+        self.encode = encode          # json.dumps default= for objects in the snapshot (storage thread)
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.seq = 0
+        self._since_compact = 0
+        self._f = None
+        self._writing = False
+        self._write_lock = threading.Lock()
+
+    # ---- recovery ----
+    def load(self) -> tuple[Dict[str, Any] | None, Iterator[Dict[str, Any]]]:
+        snap = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snap = json.load(f)
+            self.seq = int(snap.get("seq", 0))
+        return snap, self._events(self.seq)
+
+    def _journal_files(self) -> list[str]:
+        # rotated journals (state.journal.<last seq>, oldest first), then the live one
+        d = os.path.dirname(self.journal_path) or "."
+        prefix = os.path.basename(self.journal_path) + "."
+        try:
+            names = os.listdir(d)
+        except FileNotFoundError:
+            names = []
+        rotated = sorted((int(n[len(prefix):]), os.path.join(d, n)) for n in names
+                         if n.startswith(prefix) and n[len(prefix):].isdigit())
+        return [path for _, path in rotated] + [self.journal_path]
+
+    def _events(self, after_seq: int) -> Iterator[Dict[str, Any]]:
+        for path in self._journal_files():
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ev = json.loads(line)
+                    except ValueError:
+                        # torn last line after a crash
+                        continue
+                    seq = ev.get("seq", 0)
+                    if seq <= after_seq:
+                        continue
+                    self.seq = seq
+                    yield ev
+
+    # ---- writes ----
+    def _open(self):
+        if self._f is None:
+            os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+            self._f = open(self.journal_path, "a", encoding="utf-8")
+        return self._f
+
+    def record(self, op: str, **fields):
+        t = time.perf_counter()
+        self.seq += 1
+        fields["op"] = op
+        fields["seq"] = self.seq
+        fields["t"] = int(time.time())
+        f = self._open()
+        f.write(json.dumps(fields, separators=(",", ":"), ensure_ascii=False) + "\n")
+        f.flush()
+        if self.fsync:
+            os.fsync(f.fileno())
+        self._since_compact += 1
+        metrics.observe("disk_seconds", time.perf_counter() - t, op="journal_append")
+
+    # ---- compaction ----
+    @property
+    def compact_due(self) -> bool:
+        return self._since_compact >= self.compact_every and not self._writing
+
+    def begin_compact(self) -> Dict[str, Any]:
+        # event loop, between transitions: state as of self.seq; later events go to a fresh journal
+        with metrics.timer("disk_seconds", op="journal_snapshot"):
+            snap = self.snapshot_fn()
+            snap["seq"] = self.seq
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+            if os.path.exists(self.journal_path):
+                os.replace(self.journal_path, f"{self.journal_path}.{self.seq}")
+            self._since_compact = 0
+            self._writing = True
+        return snap
+
+    def write_snapshot(self, snap: Dict[str, Any]):
+        # storage thread: dump + fsync + rename, then the journals it covers can go
+        # (crash before that is fine: replay skips events with seq <= snapshot seq)
+        t = time.perf_counter()
+        with self._write_lock:
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+                tmp = self.snapshot_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(json.dumps(snap, separators=(",", ":"), ensure_ascii=False, default=self.encode))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.snapshot_path)
+                for path in self._journal_files()[:-1]:
+                    if int(path.rsplit(".", 1)[1]) <= snap["seq"]:
+                        os.unlink(path)
+            finally:
+                self._writing = False
+        metrics.observe("disk_seconds", time.perf_counter() - t, op="journal_compact")
+
+    def compact(self):
+        # both halves inline (startup / shutdown)
+        self.write_snapshot(self.begin_compact())
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
@@ -0,0 +1,77 @@
+import argparse
+import itertools
+import json
+import time
+import urllib.request
+
+# =========================
+# Fake Telegram sender (webhook mode testing)
+# Telegram jaisa Update JSON bana ke bot ke webhook pe POST karta hai
+#   python tools/fake_telegram.py --url http://127.0.0.1:8443/telegram --secret s3cr3t start --user 111
+#   ... text --user 1 "https://a.com/1"
+#   ... tap --user 111 request_link
+# =========================
+_ids = itertools.count(int(time.time() * 1000) % 1_000_000_000)
+
+def _user(uid: int, name: str) -> dict:
+    return {"id": uid, "is_bot": False, "first_name": name}
+
+def _chat(uid: int, name: str) -> dict:
+    return {"id": uid, "type": "private", "first_name": name}
+
+def message_update(uid: int, name: str, text: str) -> dict:
+    msg = {"message_id": next(_ids), "date": int(time.time()), "from": _user(uid, name),
+           "chat": _chat(uid, name), "text": text}
+    if text.startswith("/"):
+        cmd = text.split()[0]
+        msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(cmd)}]
+    return {"update_id": next(_ids), "message": msg}
+
+def callback_update(uid: int, name: str, data: str, message_id: int = 1) -> dict:
+    # the panel message the button belongs to (bot's own message)
+    msg = {"message_id": message_id, "date": int(time.time()), "chat": _chat(uid, name),
+           "from": {"id": 0, "is_bot": True, "first_name": "bot"}, "text": "panel"}
+    return {"update_id": next(_ids), "callback_query": {
+        "id": str(next(_ids)), "from": _user(uid, name), "chat_instance": str(uid),
+        "message": msg, "data": data}}
+
+def post(url: str, secret: str, update: dict) -> int:
+    req = urllib.request.Request(url, data=json.dumps(update).encode(), method="POST",
+                                 headers={"Content-Type": "application/json"})
+    if secret:
+        req.add_header("X-Telegram-Bot-Api-Secret-Token", secret)
+    with urllib.request.urlopen(req, timeout=10) as r:
+        return r.status
+
+def main():
+    ap = argparse.ArgumentParser(description="POST fake Telegram updates to the bot webhook")
+    ap.add_argument("--url", default="http://127.0.0.1:8443/telegram")
+    ap.add_argument("--secret", default="")
+    ap.add_argument("--user", type=int, required=True)
+    ap.add_argument("--name", default="Tester")
+    ap.add_argument("--repeat", type=int, default=1)
+    sub = ap.add_subparsers(dest="kind", required=True)
+    sub.add_parser("start")
+    t = sub.add_parser("text")
+    t.add_argument("text")
+    c = sub.add_parser("tap")
+    c.add_argument("data", help="callback data, e.g. request_link / copy_link / cancel_link")
+    c.add_argument("--message-id", type=int, default=1)
+    a = ap.parse_args()
+
+    t0 = time.perf_counter()
+    for _ in range(a.repeat):
+        if a.kind == "start":
+            upd = message_update(a.user, a.name, "/start")
+        elif a.kind == "text":
+            upd = message_update(a.user, a.name, a.text)
+        else:
+            upd = callback_update(a.user, a.name, a.data, a.message_id)
+        status = post(a.url, a.secret, upd)
+        if status != 200:
+            print(f"❌ HTTP {status}")
+    dt = time.perf_counter() - t0
+    print(f"✅ {a.repeat} update(s) posted in {dt * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import asyncio
+import csv
+import functools
+import itertools
+import os
+import random
+import sys
+import time
+import types
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+
+# =========================
+# Fake Telegram pieces for the tools/ harnesses
+# main.py ko bina Telegram ke chalane ke liye: fake Bot, updates, JobQueue, clock
+# =========================
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OWNER_ID = 1
+
+class FakeClock:
+    # wall clock the bot sees (datetime.now / time.time in timers); moves only when told
+    def __init__(self, start: float | None = None):
+        self.t = time.time() if start is None else start
+
+    def time(self) -> float:
+        return self.t
+
+def fake_datetime(clock: FakeClock) -> type:
+    class FakeDateTime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(clock.t, tz)
+    return FakeDateTime
+
+class FakeBot:
+    # every Bot API call: optional random latency, returns a message-like object
+    def __init__(self, jitter: float = 0.0):
+        self.jitter = jitter
+        self.calls: Counter[str] = Counter()
+        self.owner_calls: Counter[str] = Counter()     # owner notifications (subset of calls)
+        self._ids = itertools.count(1)
+
+    async def _call(self, method: str, **kwargs):
+        self.calls[method] += 1
+        if kwargs.get("chat_id") == OWNER_ID:
+            self.owner_calls[method] += 1
+        await asyncio.sleep(random.random() * self.jitter if self.jitter else 0)
+        return SimpleNamespace(message_id=next(self._ids), chat_id=kwargs.get("chat_id"))
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return functools.partial(self._call, method)
+
+class FakeMessage:
+    def __init__(self, bot: FakeBot, chat_id: int, text: str = "", message_id: int = 1):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.text = text
+        self.message_id = message_id
+        self.document = None
+
+    async def reply_text(self, text: str, **kwargs):
+        return await self.bot.send_message(chat_id=self.chat_id, text=text, **kwargs)
+
+class FakeQuery:
+    def __init__(self, bot: FakeBot, user_id: int, data: str, message_id: int):
+        self.bot = bot
+        self.from_user = SimpleNamespace(id=user_id, first_name=f"emp{user_id}")
+        self.data = data
+        self.message = SimpleNamespace(message_id=message_id, chat_id=user_id)
+
+    async def answer(self, *args, **kwargs):
+        return await self.bot.answer_callback_query(callback_query_id=0)
+
+    async def edit_message_text(self, text: str, **kwargs):
+        return await self.bot.edit_message_text(chat_id=self.from_user.id, message_id=self.message.message_id,
+                                                text=text, **kwargs)
+
+def message_update(bot: FakeBot, user_id: int, text: str, first_name: str = "") -> SimpleNamespace:
+    user = SimpleNamespace(id=user_id, first_name=first_name or f"user{user_id}")
+    return SimpleNamespace(effective_user=user, message=FakeMessage(bot, user_id, text))
+
+def callback_update(bot: FakeBot, user_id: int, data: str, message_id: int = 1) -> SimpleNamespace:
+    q = FakeQuery(bot, user_id, data, message_id)
+    return SimpleNamespace(effective_user=q.from_user, callback_query=q, message=None)
+
+def fake_context(bot: FakeBot, args: list[str] | None = None) -> SimpleNamespace:
+    return SimpleNamespace(bot=bot, args=args or [])
+
+class FakeJobQueue:
+    # run_repeating jobs, fired by run_due() against the fake clock
+    def __init__(self, clock: FakeClock, bot: FakeBot):
+        self.clock = clock
+        self.bot = bot
+        self.jobs: list[list] = []      # [next_at, interval, callback]
+        self.runs: Counter[str] = Counter()
+
+    def run_repeating(self, callback, interval: float, first: float | None = None, **kwargs):
+        self.jobs.append([self.clock.t + (interval if first is None else first), interval, callback])
+
+    def next_run(self) -> float | None:
+        return min((job[0] for job in self.jobs), default=None)
+
+    async def run_due(self):
+        # a clock jump over several ticks runs the job once (missed runs coalesced)
+        for job in self.jobs:
+            if job[0] <= self.clock.t:
+                job[0] += job[1] * (1 + int((self.clock.t - job[0]) // job[1]))
+                self.runs[job[2].__name__] += 1
+                await job[2](fake_context(self.bot))
+
+def disk_io() -> tuple[int, int] | None:
+    # (write syscalls, bytes written) for this process incl. threads; Linux only
+    try:
+        with open("/proc/self/io", "r") as f:
+            io = dict(line.split(": ") for line in f.read().splitlines())
+        return int(io["syscw"]), int(io["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+def load_main(workdir: str, employees: list[int], backend: str = "memory", db: str = "",
+              names: dict[int, str] | None = None, **settings):
+    # fresh data dir + stub config, then import main.py from the repo root
+    os.chdir(workdir)
+    os.makedirs("data", exist_ok=True)
+    with open(os.path.join("data", "employees.csv"), "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["name", "telegram_id", "status"])
+        for uid in employees:
+            w.writerow([(names or {}).get(uid) or f"emp{uid}", uid, "active"])
+
+    cfg = types.ModuleType("config")
+    cfg.BOT_TOKEN = "0:fake"
+    cfg.OWNER_ID = OWNER_ID
+    cfg.EMPLOYEES_CSV = os.path.join("data", "employees.csv")
+    cfg.STATE_BACKEND = backend
+    cfg.STATE_DB = db
+    sys.modules["config"] = cfg
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import main
+    for k, v in settings.items():
+        setattr(main, k, v)
+    return main
+
+def unthrottle(outbox):
+    # fake API: no Telegram rate limits to respect
+    outbox.global_rate = outbox.chat_rate = 1e9
+    outbox.chat_burst = 10 ** 9
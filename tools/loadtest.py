@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+from fakes import (OWNER_ID, FakeBot, FakeClock, FakeJobQueue, callback_update, disk_io,
+                   fake_context, fake_datetime, load_main, message_update, unthrottle)
+
+# =========================
+# Synthetic load test (fake Bot + fake JobQueue + controllable clock)
+# asli handlers: /start, owner_link_message, callbacks ke saare branches, timer expiry;
+# har action ke liye latency percentiles, API calls aur disk writes
+#   python tools/loadtest.py --employees 500 --rounds 3
+# =========================
+class Sim:
+    def __init__(self, a):
+        self.a = a
+        self.employees = list(range(1000, 1000 + a.employees))
+        self.workdir = tempfile.mkdtemp(prefix="loadtest-")
+        self.main = load_main(self.workdir, self.employees, a.backend,
+                              os.path.join(self.workdir, "state.sqlite3"))
+        m = self.main
+        self.clock = FakeClock()
+        self.bot = FakeBot(a.jitter)
+        self.jq = FakeJobQueue(self.clock, self.bot)
+
+        # the bot's idea of "now" comes from the fake clock; timers are driven by advance()
+        m.datetime = fake_datetime(self.clock)
+        m.expiry.clock = m.panel_flips.clock = self.clock.time
+        m.state.restore()
+        m.refresh_rosters()
+        m.register_jobs(self.jq)
+
+        self.lat: dict[str, list[float]] = defaultdict(list)
+        self.count: Counter[str] = Counter()
+        self.calls: dict[str, Counter[str]] = defaultdict(Counter)
+        self.owner_calls: dict[str, Counter[str]] = defaultdict(Counter)
+        self.disk: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        self.wall = 0.0
+        self.updates = 0
+
+    async def setup(self):
+        unthrottle(self.main.outbox)
+        self.main.outbox.start(self.bot)
+        self.main.daily_writer.start()
+
+    async def close(self):
+        await self.main.outbox.stop()
+        self.main.daily_writer.close()
+        self.main.state.close()
+
+    async def settle(self):
+        # everything queued for Telegram / the sheet is done
+        m = self.main
+        while m.outbox.queue_length or m.outbox.stats()["inflight"]:
+            await asyncio.sleep(0.001)
+        while m.waitlist_task is not None:
+            await asyncio.sleep(0.001)
+        m.daily_writer.flush()
+
+    async def advance(self, seconds: float):
+        self.clock.t += seconds
+        m = self.main
+        t0 = time.perf_counter()
+        due = m.expiry.pop_due(self.clock.t)
+        if due:
+            await m.expire_due(due)
+        flips = m.panel_flips.pop_due(self.clock.t)
+        if flips:
+            await m.flip_panels(flips)
+        await self.jq.run_due()
+        if due:
+            # one timer batch; per-assignment share of it
+            per = (time.perf_counter() - t0) / len(due)
+            self.lat["expire(timer)"] += [per] * len(due)
+            self.count["expire(timer)"] += len(due)
+
+    async def phase(self, label: str, calls: list):
+        # calls: [(handler, update, context)]; run with the bot's concurrency
+        await self.settle()
+        sem = asyncio.Semaphore(self.a.concurrency)
+        api0, own0 = Counter(self.bot.calls), Counter(self.bot.owner_calls)
+        io0 = disk_io()
+
+        async def one(handler, update, context):
+            async with sem:
+                t = time.perf_counter()
+                await handler(update, context)
+                self.lat[label].append(time.perf_counter() - t)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(*c) for c in calls))
+        await self.settle()
+        self.wall += time.perf_counter() - t0
+        self.updates += len(calls)
+        self.count[label] += len(calls)
+        self.calls[label] += Counter(self.bot.calls) - api0
+        self.owner_calls[label] += Counter(self.bot.owner_calls) - own0
+        io1 = disk_io()
+        if io0 and io1:
+            self.disk[label][0] += io1[0] - io0[0]
+            self.disk[label][1] += io1[1] - io0[1]
+
+    async def expire_phase(self):
+        # everyone holds a link; move the clock past LINK_EXPIRE_SECONDS
+        await self.settle()
+        api0, own0, io0 = Counter(self.bot.calls), Counter(self.bot.owner_calls), disk_io()
+        t0 = time.perf_counter()
+        await self.advance(self.main.LINK_EXPIRE_SECONDS + 1)
+        await self.settle()
+        self.wall += time.perf_counter() - t0
+        self.calls["expire(timer)"] += Counter(self.bot.calls) - api0
+        self.owner_calls["expire(timer)"] += Counter(self.bot.owner_calls) - own0
+        io1 = disk_io()
+        if io0 and io1:
+            self.disk["expire(timer)"][0] += io1[0] - io0[0]
+            self.disk["expire(timer)"][1] += io1[1] - io0[1]
+
+    def taps(self, data: str) -> list:
+        m = self.main
+        return [(m.callbacks, callback_update(self.bot, uid, data, m.panel_msg_by_user.get(uid, 1)), None)
+                for uid in self.employees]
+
+    async def run(self):
+        m, a = self.main, self.a
+        await self.setup()
+        await self.phase("start", [(m.start, message_update(self.bot, uid, "/start"), fake_context(self.bot))
+                                   for uid in self.employees])
+
+        # enough links for every request below, a few per message like a real paste
+        n_links = a.employees * 5 * a.rounds
+        urls = [f"https://load.example/{i}" for i in range(n_links)]
+        msgs = ["\n".join(urls[i:i + a.links_per_message]) for i in range(0, n_links, a.links_per_message)]
+        await self.phase("owner_link_message", [
+            (m.owner_link_message, message_update(self.bot, OWNER_ID, text, "Owner"), fake_context(self.bot))
+            for text in msgs])
+
+        for _ in range(a.rounds):
+            await self.phase("request_link", self.taps("request_link"))
+            await self.advance(m.REQUEST_COOLDOWN_SECONDS)
+            await self.phase("copy_link", self.taps("copy_link"))
+            await self.phase("request_link", self.taps("request_link"))
+            await self.phase("cancel_link", self.taps("cancel_link"))
+            await self.phase("request_link", self.taps("request_link"))
+            await self.phase("expire_manual", self.taps("expire_manual"))
+            await self.phase("request_link", self.taps("request_link"))
+            await self.expire_phase()
+        await self.close()
+
+    def report(self):
+        def pct(xs: list[float], q: float) -> float:
+            xs = sorted(xs)
+            return xs[min(len(xs) - 1, int(q * len(xs)))] * 1000 if xs else 0.0
+
+        a = self.a
+        print(f"🧪 {a.employees} employees | {a.rounds} rounds | backend {a.backend} | concurrency {a.concurrency}")
+        print(f"⚡ {self.updates} updates in {self.wall:.2f}s -> {self.updates / max(self.wall, 1e-9):.0f} updates/s\n")
+        # api/act = all calls; panel/act = to the employee, without answer_callback_query and owner notifications
+        print(f"{'action':<20}{'n':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+              f"{'api/act':>9}{'panel/act':>10}{'wr/act':>8}{'KB/act':>8}  api calls by method (per action)")
+        for label in self.lat:
+            xs, n = self.lat[label], self.count[label] or 1
+            calls = self.calls[label]
+            panel = sum(calls.values()) - calls["answer_callback_query"] - sum(self.owner_calls[label].values())
+            by = " ".join(f"{k}={v / n:.2f}" for k, v in sorted(calls.items()))
+            wr, nbytes = self.disk[label]
+            print(f"{label:<20}{self.count[label]:>7}{pct(xs, .5):>9.2f}{pct(xs, .9):>9.2f}{pct(xs, .99):>9.2f}"
+                  f"{max(xs) * 1000:>9.2f}{sum(calls.values()) / n:>9.2f}{panel / n:>10.2f}{wr / n:>8.2f}"
+                  f"{nbytes / n / 1024:>8.2f}  {by}")
+        if disk_io() is None:
+            print("\n(disk columns need /proc/self/io; not available here)")
+        if self.a.keep:
+            print(f"\n📂 data: {self.workdir}")
+        else:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Load test main.py handlers against a fake Telegram Bot")
+    ap.add_argument("--employees", type=int, default=500)
+    ap.add_argument("--rounds", type=int, default=2)
+    ap.add_argument("--links-per-message", type=int, default=5)
+    ap.add_argument("--concurrency", type=int, default=64, help="parallel updates (CONCURRENT_UPDATES)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="max fake Bot API latency (s)")
+    ap.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--keep", action="store_true", help="keep the temp data dir (sheets, journal)")
+    a = ap.parse_args()
+    random.seed(a.seed)
+
+    async def go():
+        sim = Sim(a)
+        await sim.run()
+        sim.report()
+    asyncio.run(go())
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,94 @@
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend import MemoryBackend, PendingLink  # noqa: E402
+
+# =========================
+# Memory benchmark: bytes per queued link / pending assignment / employee counters
+# MemoryBackend ko tracemalloc ke saath bharta hai:
+#   ingest  - add_links (owner/admin pastes)
+#   restore - snapshot se restart (JSON se aaye objects, koi sharing nahi)
+#   pending - take() se assignments
+#   counters- har employee ke din ke counters
+#   python tools/membench.py --links 100000 --users 5000
+# =========================
+def make_pending(item) -> PendingLink:
+    now = time.time()
+    return PendingLink(item.url, item.by, now, now + 300, now + 60, now + 300)
+
+class Meter:
+    def __enter__(self):
+        gc.collect()
+        self.start = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc):
+        gc.collect()
+        self.bytes = tracemalloc.get_traced_memory()[0] - self.start
+
+def url(i: int) -> str:
+    # realistic length (~60 chars), unique
+    return f"https://www.example-shop.com/products/item-{i:08d}?ref=bulk&src=tg"
+
+def run(a) -> list[tuple[str, int, int]]:
+    tmp = tempfile.mkdtemp(prefix="membench-")
+    contributors = [(9_000_000_000 + i, f"Admin {i}") for i in range(a.contributors)]
+    rows = []
+    try:
+        tracemalloc.start()
+        be = MemoryBackend(tmp, compact_every=10 ** 9)
+
+        with Meter() as m:
+            for start in range(0, a.links, a.batch):
+                by_id, by_name = contributors[(start // a.batch) % len(contributors)]
+                # fresh objects per paste, like parsed Telegram messages
+                be.add_links(int(str(by_id)), str(by_name + " ")[:-1],
+                             [url(i) for i in range(start, min(a.links, start + a.batch))])
+        rows.append(("queued link (ingest)", a.links, m.bytes))
+
+        with Meter() as m:
+            for uid in range(a.pending):
+                be.take(1_000_000 + uid, make_pending)
+        rows.append(("pending assignment", a.pending, m.bytes))
+
+        with Meter() as m:
+            for uid in range(a.users):
+                be.user_stats(2_000_000 + uid)
+        rows.append(("employee day counters", a.users, m.bytes))
+
+        be.close()
+        del be
+        with Meter() as m:
+            be = MemoryBackend(tmp, compact_every=10 ** 9)
+            be.restore()
+        rows.append(("restored state / queued link", be.queued(), m.bytes))
+        be.journal.close()
+    finally:
+        tracemalloc.stop()
+        shutil.rmtree(tmp, ignore_errors=True)
+    return rows
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Bytes per queued link / assignment / employee in MemoryBackend")
+    ap.add_argument("--links", type=int, default=100_000)
+    ap.add_argument("--contributors", type=int, default=20)
+    ap.add_argument("--batch", type=int, default=500, help="links per owner/admin paste")
+    ap.add_argument("--pending", type=int, default=2000)
+    ap.add_argument("--users", type=int, default=5000)
+    a = ap.parse_args()
+
+    print(f"🧮 {a.links} links from {a.contributors} contributors | {a.pending} pending | {a.users} employees\n")
+    print(f"{'':<30}{'n':>9}{'MB':>9}{'bytes/each':>12}")
+    for label, n, nbytes in run(a):
+        print(f"{label:<30}{n:>9}{nbytes / 1e6:>9.2f}{nbytes / max(n, 1):>12.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,370 @@
+import argparse
+import ast
+import asyncio
+import csv
+import heapq
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from fakes import (ROOT, OWNER_ID, FakeBot, FakeClock, FakeJobQueue, callback_update,
+                   fake_datetime, load_main, unthrottle)
+
+sys.path.insert(0, ROOT)
+from analytics import percentile, summarize_day  # noqa: E402
+
+# =========================
+# Trace replay: ek din ki sheet (data/YYYY-MM-DD.csv) ko asli pool/assignment/expiry logic pe
+# simulated clock ke saath dobara chalao -- naye settings / scheduler ko real traffic pe test karo
+#   python tools/replay.py data/2025-10-16.csv --speed 0 --set LINK_EXPIRE_SECONDS=120
+#   python tools/replay.py data/2025-10-16.csv --set POOL_MODE=rr --set REQUEST_COOLDOWN_SECONDS=30
+# har employee ka "script" trace se banta hai: REQUEST kab dabaya, aur har mile hue link ke saath
+# kya kiya (kitne second baad copy / cancel / remove, ya kuch nahi -> timer expiry).
+# replay me jo bhi link mile, uspe employee wahi next action utne hi second baad karta hai.
+# =========================
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+TAPS = {"copy": "copy_link", "cancel": "cancel_link", "remove": "expire_manual"}
+
+def _ts(s: str) -> float | None:
+    try:
+        return datetime.strptime(s, TIME_FMT).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class Trace:
+    # requests[uid] = [t, ...]; outcomes[uid] = [(kind, offset), ...] in assignment order
+    # kind: copy | cancel | remove (a tap after offset s) | expire | replaced (no tap)
+    def __init__(self, path: str):
+        self.path = path
+        self.requests: dict[int, list[float]] = defaultdict(list)
+        self.outcomes: dict[int, list[tuple[str, float]]] = defaultdict(list)
+        self.arrivals: dict[str, tuple[float, int, str]] = {}     # url -> (first seen, by_id, by_name)
+        self.names: dict[int, str] = {}
+        self.rows = 0
+        self._load()
+
+    def _load(self):
+        open_: dict[tuple[int, str], tuple[float, int]] = {}   # (uid, url) -> (sent, outcome index)
+        with open(self.path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.rows += 1
+                try:
+                    uid = int(row["employee_id"])
+                except (KeyError, ValueError):
+                    continue
+                url, status = row.get("link", ""), row.get("status", "")
+                self.names[uid] = row.get("employee_name", "")
+                if status == "pending":
+                    sent = _ts(row.get("sent_time", ""))
+                    if sent is None:
+                        continue
+                    by = row.get("by_id", "")
+                    self.arrivals.setdefault(url, (sent, int(by) if by.isdigit() else OWNER_ID,
+                                                   row.get("by_name", "") or "OWNER"))
+                    self.requests[uid].append(sent)
+                    # until we see how it ended: nobody touched it
+                    self.outcomes[uid].append(("expire", 0.0))
+                    open_[(uid, url)] = (sent, len(self.outcomes[uid]) - 1)
+                    continue
+
+                ent = open_.pop((uid, url), None)
+                if ent is None:
+                    continue
+                sent, i = ent
+                if status == "done":
+                    kind = "replaced" if row.get("note", "").startswith("Requested new") else "copy"
+                    at = _ts(row.get("done_time", ""))
+                elif status == "cancelled":
+                    kind, at = "cancel", _ts(row.get("cancelled_time", ""))
+                elif status == "expired":
+                    kind = "remove" if row.get("note", "").startswith("Manual") else "expire"
+                    at = _ts(row.get("expired_time", ""))
+                else:
+                    continue
+                self.outcomes[uid][i] = (kind, max(0.0, (at or sent) - sent))
+
+    @property
+    def start(self) -> float:
+        return min((t for t, _, _ in self.arrivals.values()), default=time.time())
+
+    def counts(self) -> Counter:
+        return Counter(kind for outs in self.outcomes.values() for kind, _ in outs)
+
+class Replay:
+    def __init__(self, a, trace: Trace):
+        self.a = a
+        self.trace = trace
+        self.workdir = tempfile.mkdtemp(prefix="replay-")
+        employees = sorted(trace.requests)
+        self.main = load_main(self.workdir, employees, a.backend, os.path.join(self.workdir, "state.sqlite3"),
+                              names=trace.names, PERF_PROM_FILE="")
+        m = self.main
+        for k, v in a.settings.items():
+            if k == "POOL_MODE":
+                m.state.set_mode(v)
+            else:
+                setattr(m, k, v)
+
+        self.clock = FakeClock(trace.start - 1)
+        self.bot = FakeBot()
+        self.jq = FakeJobQueue(self.clock, self.bot)
+        m.datetime = fake_datetime(self.clock)
+        m.expiry.clock = m.panel_flips.clock = self.clock.time
+        m.state.restore()
+        m.refresh_rosters()
+        m.register_jobs(self.jq)
+
+        self._heap: list[tuple[float, int, str, tuple]] = []
+        self._seq = itertools.count()
+        self.next_outcome: dict[int, int] = defaultdict(int)
+        self.busy: dict[int, str] = {}                 # uid -> url they still have to act on
+        self.deferred: dict[int, int] = Counter()      # uid -> requests waiting for them to be free
+        self.stats: Counter[str] = Counter()
+        self.samples: list[tuple[float, int, int, int]] = []   # (t, pool, pending, waitlist)
+        self.pending_area = 0.0
+        self.pending_max = 0
+        self._last_t = self.clock.t
+
+        # see every assignment / expiry the real code makes
+        orig_assign, orig_expire = m.assign_link_to_user, m.expire_assignment
+
+        async def assign(user_id, pl, new_panel=False):
+            await orig_assign(user_id, pl, new_panel)
+            self.on_assigned(user_id, pl)
+
+        async def expire(user_id):
+            before = m.state.get(user_id)
+            await orig_expire(user_id)
+            if before is not None and m.state.get(user_id) is None:
+                self.stats["timer expired"] += 1
+                self.free(user_id, before.url)
+
+        m.assign_link_to_user, m.expire_assignment = assign, expire
+
+    # ---- events ----
+    def push(self, t: float, kind: str, *args):
+        heapq.heappush(self._heap, (t, next(self._seq), kind, args))
+
+    def load_events(self):
+        lead = self.a.lead
+        for url, (t, by_id, by_name) in self.trace.arrivals.items():
+            self.push(self.trace.start - 1 if self.a.preload else t - lead, "add", url, by_id, by_name)
+        for uid, times in self.trace.requests.items():
+            for t in times:
+                self.push(t, "request", uid)
+
+    def on_assigned(self, uid: int, pl):
+        self.stats["assigned"] += 1
+        outs = self.trace.outcomes.get(uid, [])
+        i = self.next_outcome[uid]
+        self.next_outcome[uid] += 1
+        kind, offset = outs[i] if i < len(outs) else ("expire", 0.0)
+        self.stats[f"script {kind}"] += 1
+        if kind in TAPS:
+            self.busy[uid] = pl.url
+            self.push(self.clock.t + offset, "tap", uid, TAPS[kind], pl.url)
+        elif kind == "expire":
+            self.busy[uid] = pl.url
+        # replaced: their next REQUEST finishes it, nothing to wait for
+
+    def free(self, uid: int, url: str):
+        if self.busy.get(uid) != url:
+            return
+        del self.busy[uid]
+        if self.deferred[uid]:
+            self.deferred[uid] -= 1
+            self.push(self.clock.t, "request", uid)
+
+    async def tap(self, uid: int, data: str):
+        m = self.main
+        await m.callbacks(callback_update(self.bot, uid, data, m.panel_msg_by_user.get(uid, 1)), None)
+        self.stats[f"tap {data}"] += 1
+
+    async def handle(self, kind: str, args: tuple):
+        m = self.main
+        if kind == "add":
+            url, by_id, by_name = args
+            await m.add_links(by_id, by_name, [url])
+        elif kind == "request":
+            uid = args[0]
+            if uid in self.busy:
+                # still on the previous link in this replay -> asks once done with it
+                self.deferred[uid] += 1
+                self.stats["request deferred (busy)"] += 1
+                return
+            before = m.state.get(uid)
+            n = self.stats["assigned"]
+            await self.tap(uid, "request_link")
+            if self.stats["assigned"] == n and uid not in m.waitlist and before is not None \
+                    and m.state.get(uid) is before:
+                # cooldown: the button comes back at request_after, they tap again then
+                self.stats["request retried (cooldown)"] += 1
+                self.push(max(self.clock.t, before.request_after) + 0.01, "request", uid)
+            elif uid in m.waitlist:
+                self.stats["request waitlisted"] += 1
+        elif kind == "tap":
+            uid, data, url = args
+            pl = m.state.get(uid)
+            if pl is None or pl.url != url:
+                # link already gone (e.g. shorter expiry) -> employee's tap is too late
+                self.stats[f"late {data}"] += 1
+                self.free(uid, url)
+                return
+            await self.tap(uid, data)
+            self.free(uid, url)
+
+    # ---- clock ----
+    def next_time(self) -> float | None:
+        m = self.main
+        ts = [t for t in (self._heap[0][0] if self._heap else None, m.expiry.next_deadline(),
+                          m.panel_flips.next_deadline()) if t is not None]
+        return min(ts) if ts else None
+
+    def observe(self, t: float):
+        # pending-set size integrated over sim time + periodic pool/pending samples
+        m = self.main
+        pending = m.state.pending_count()
+        self.pending_area += pending * (t - self._last_t)
+        self._last_t = t
+        self.pending_max = max(self.pending_max, pending)
+        every = self.a.every * 60
+        while not self.samples or self.samples[-1][0] + every <= t:
+            at = self.samples[-1][0] + every if self.samples else t
+            self.samples.append((at, m.state.queued(), pending, len(m.waitlist)))
+
+    async def settle(self):
+        m = self.main
+        while m.outbox.queue_length or m.outbox.stats()["inflight"] or m.waitlist_task is not None:
+            await asyncio.sleep(0)
+
+    async def run(self):
+        m, a = self.main, self.a
+        unthrottle(m.outbox)
+        m.outbox.start(self.bot)
+        m.daily_writer.start()
+        self.load_events()
+
+        t0_sim, t0_wall = self.clock.t, time.perf_counter()
+        events = 0
+        while True:
+            t = self.next_time()
+            if t is None:
+                break
+            if a.speed > 0:
+                ahead = (t - t0_sim) / a.speed - (time.perf_counter() - t0_wall)
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+            self.observe(max(t, self.clock.t))
+            self.clock.t = max(t, self.clock.t)
+
+            due = m.expiry.pop_due(self.clock.t)
+            if due:
+                await m.expiry.on_expire(due)
+                events += len(due)
+            flips = m.panel_flips.pop_due(self.clock.t)
+            if flips:
+                await m.panel_flips.on_expire(flips)
+            await self.jq.run_due()
+            while self._heap and self._heap[0][0] <= self.clock.t:
+                _, _, kind, args = heapq.heappop(self._heap)
+                await self.handle(kind, args)
+                events += 1
+            await self.settle()
+
+        self.observe(self.clock.t)
+        self.wall = time.perf_counter() - t0_wall
+        self.sim = self.clock.t - t0_sim
+        self.events = events
+        await m.outbox.stop()
+        m.daily_writer.close()
+        m.state.close()
+
+    # ---- report ----
+    def report(self):
+        m, a = self.main, self.a
+        cache = os.path.join(self.workdir, "analytics")
+        day = datetime.fromtimestamp(self.trace.start).date()
+        before = summarize_day(os.path.dirname(os.path.abspath(self.trace.path)) or ".", day, cache) \
+            if os.path.basename(self.trace.path) == f"{day:%Y-%m-%d}.csv" else None
+        sheets = [f for f in os.listdir(m.DATA_DIR) if f[:4].isdigit() and f.endswith(".csv")]
+        after = {"entities": {"all": Counter()}}
+        for f in sheets:
+            s = summarize_day(m.DATA_DIR, datetime.strptime(f[:-4], "%Y-%m-%d").date(), cache)
+            if s:
+                e = s["entities"]["all"]
+                acc = after["entities"]["all"]
+                for k in ("assigned", "done", "cancelled", "expired", "removed"):
+                    acc[k] += e[k]
+                acc.setdefault("ttc", Counter()).update(e["ttc"])
+
+        sets = " ".join(f"{k}={v}" for k, v in a.settings.items()) or "(repo defaults)"
+        print(f"🎬 {self.trace.path}: {self.trace.rows} rows | {len(self.trace.requests)} employees "
+              f"| {len(self.trace.arrivals)} links")
+        print(f"⚙️ {sets} | backend {a.backend} | speed {'max' if a.speed <= 0 else f'{a.speed:g}x'}")
+        print(f"⚡ {self.events} events, {self.sim / 3600:.1f}h sim in {self.wall:.2f}s wall -> "
+              f"{self.events / max(self.wall, 1e-9):.0f} events/s, {self.sim / max(self.wall, 1e-9):.0f}x real time")
+        print(f"⏳ pending: avg {self.pending_area / max(self.sim, 1e-9):.1f} | max {self.pending_max}\n")
+
+        def row(label: str, e: dict) -> str:
+            ttc = e.get("ttc") or {}
+            p50, p90 = percentile(ttc, 0.5), percentile(ttc, 0.9)
+            return (f"{label:<10}{e['assigned']:>9}{e['done']:>7}{e['cancelled']:>8}{e['expired']:>9}{e['removed']:>9}"
+                    f"{'-' if p50 is None else p50:>9}{'-' if p90 is None else p90:>9}")
+        print(f"{'':<10}{'assigned':>9}{'done':>7}{'cancel':>8}{'expired':>9}{'removed':>9}{'ttc p50':>9}{'ttc p90':>9}")
+        if before:
+            print(row("original", before["entities"]["all"]))
+        print(row("replay", after["entities"]["all"]))
+
+        print("\n📋 " + " | ".join(f"{k} {v}" for k, v in sorted(self.stats.items())))
+
+        peak = max((s[1] for s in self.samples), default=0) or 1
+        print(f"\n{'time':<7}{'pool':>7}{'pending':>9}{'wait':>6}  pool depth (every {a.every} min)")
+        for t, pool, pending, wait in self.samples:
+            bar = "█" * round(pool * 40 / peak)
+            print(f"{datetime.fromtimestamp(t):%H:%M}  {pool:>7}{pending:>9}{wait:>6}  {bar}")
+        if a.keep:
+            print(f"\n📂 replay data: {self.workdir}")
+        else:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+def parse_setting(s: str) -> tuple[str, object]:
+    k, _, v = s.partition("=")
+    try:
+        return k.strip(), ast.literal_eval(v)
+    except (ValueError, SyntaxError):
+        return k.strip(), v
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Replay a daily sheet through main.py's pool/assignment/expiry logic")
+    ap.add_argument("sheet", help="data/YYYY-MM-DD.csv")
+    ap.add_argument("--speed", type=float, default=0, help="1 = real time, 100 = 100x, 0 = as fast as possible")
+    ap.add_argument("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                    help="override a main.py setting, e.g. LINK_EXPIRE_SECONDS=120 or POOL_MODE=rr")
+    ap.add_argument("--lead", type=float, default=0, help="links enter the pool this many s before first use")
+    ap.add_argument("--preload", action="store_true", help="all links in the pool at the start of the day")
+    ap.add_argument("--every", type=int, default=30, help="pool depth sample interval (minutes)")
+    ap.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    ap.add_argument("--keep", action="store_true", help="keep the replay's data dir (sheet, journal)")
+    a = ap.parse_args()
+    a.sheet = os.path.abspath(a.sheet)
+    a.settings = dict(parse_setting(s) for s in a.settings)
+
+    trace = Trace(a.sheet)
+    if not trace.requests:
+        print("❌ no assignments in this sheet")
+        return 1
+
+    async def go():
+        r = Replay(a, trace)
+        await r.run()
+        r.report()
+    asyncio.run(go())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
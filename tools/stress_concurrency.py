@@ -0,0 +1,247 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+from fakes import OWNER_ID, ROOT, FakeBot, callback_update, load_main, unthrottle
+
+# =========================
+# Concurrency stress test
+# main.py ke asli handlers ko bahut saare employees ke parallel taps (double taps bhi),
+# parallel link adds aur chhote expiry timers ke saath chalata hai, phir check karta hai:
+#   - koi link ek saath do employees ke paas nahi gaya (daily sheet ka event order)
+#   - koi link kho nahi gaya (pool + pending + copied/removed == added)
+#   python tools/stress_concurrency.py --employees 50 --links 2000 --seconds 10
+#   python tools/stress_concurrency.py --backend sqlite --workers 4   (kai processes, ek DB)
+# =========================
+ACTIONS = ("request_link", "copy_link", "cancel_link", "expire_manual")
+ACTION_WEIGHTS = (5, 3, 2, 1)
+
+async def tap(main, bot: FakeBot, user_id: int, data: str):
+    await main.callbacks(callback_update(bot, user_id, data, main.panel_msg_by_user.get(user_id, 1)), None)
+
+async def employee_loop(main, bot: FakeBot, user_id: int, stop_at: float, double_tap: float,
+                        taps: Counter, seed: int):
+    rnd = random.Random(seed * 1_000_003 + user_id)
+    while time.monotonic() < stop_at:
+        data = rnd.choices(ACTIONS, ACTION_WEIGHTS)[0]
+        n = 2 if rnd.random() < double_tap else 1
+        taps[data] += n
+        await asyncio.gather(*(tap(main, bot, user_id, data) for _ in range(n)))
+        await asyncio.sleep(rnd.random() * 0.005)
+
+async def sweep_loop(main, stop_at: float):
+    # shared backend: what the expiry_sweep_job does every few seconds, just faster
+    while time.monotonic() < stop_at:
+        await main.expiry_sweep_job(None)
+        await asyncio.sleep(0.05)
+
+async def owner_loop(main, urls: list[str], stop_at: float, waves: int):
+    # links arrive in waves while employees are busy (exercises the wait list too)
+    size = max(1, len(urls) // waves)
+    pause = max(0.0, (stop_at - time.monotonic()) / (waves + 1))
+    for i in range(0, len(urls), size):
+        await main.add_links(OWNER_ID, "OWNER", urls[i:i + size])
+        await asyncio.sleep(pause)
+
+def check_sheet(path: str, all_urls: set[str]) -> tuple[list[str], set[str], Counter]:
+    # replay the sheet in write order: a link may only be assigned while nobody holds it
+    errors: list[str] = []
+    holder: dict[str, str] = {}
+    terminal: set[str] = set()
+    statuses: Counter[str] = Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            url, st, emp = row["link"], row["status"], row["employee_id"]
+            statuses[st] += 1
+            if url not in all_urls:
+                errors.append(f"unknown link {url}")
+            elif st == "pending":
+                if url in holder:
+                    errors.append(f"{url} assigned to {emp} while held by {holder[url]}")
+                if url in terminal:
+                    errors.append(f"{url} assigned again after it was finished")
+                holder[url] = emp
+            else:
+                if holder.get(url) != emp:
+                    errors.append(f"{url} {st} by {emp} but held by {holder.get(url)}")
+                holder.pop(url, None)
+                if st == "done" or row["note"].startswith("Manual"):
+                    terminal.add(url)
+    return errors, terminal, statuses
+
+def check_terminal(paths: list[str]) -> tuple[list[str], set[str], Counter]:
+    # several workers, several sheets: no global order, but a link finishes at most once
+    errors: list[str] = []
+    finished: Counter[str] = Counter()
+    statuses: Counter[str] = Counter()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                statuses[row["status"]] += 1
+                if row["status"] == "done" or row["note"].startswith("Manual"):
+                    finished[row["link"]] += 1
+    errors += [f"{u} finished {n} times" for u, n in finished.items() if n > 1]
+    return errors, set(finished), statuses
+
+def check_accounting(urls: list[str], pooled: list[str], pending: list[str], terminal: set[str]) -> list[str]:
+    where: dict[str, list[str]] = defaultdict(list)
+    for u in pooled:
+        where[u].append("pool")
+    for u in pending:
+        where[u].append("pending")
+    for u in terminal:
+        where[u].append("finished")
+    return [f"{u} found in {where.get(u, [])}" for u in urls if len(where.get(u, ())) != 1]
+
+def stress_urls(n: int) -> list[str]:
+    return [f"https://stress.example/{i}" for i in range(n)]
+
+async def run_worker(a, workdir: str, adds_links: bool) -> tuple:
+    employees = list(range(1000, 1000 + a.employees))
+    main = load_main(workdir, employees, a.backend, a.db)
+    main.state.restore()
+
+    main.LINK_EXPIRE_SECONDS = a.expire
+    main.REQUEST_COOLDOWN_SECONDS = 0
+    main.CANCEL_ACTIVE_SECONDS = 3600
+    main.MAX_LINKS_PER_USER = 10 ** 9
+    main.refresh_rosters()
+    main.daily_writer.start()
+
+    bot = FakeBot(a.jitter)
+    unthrottle(main.outbox)
+    main.outbox.start(bot)
+    main.expiry.start()
+    main.panel_flips.start()
+
+    urls = stress_urls(a.links)
+    taps: Counter[str] = Counter()
+    t0 = time.monotonic()
+    stop_at = t0 + a.seconds
+    jobs = [employee_loop(main, bot, uid, stop_at, a.double_tap, taps, a.seed) for uid in employees]
+    if adds_links:
+        jobs.append(owner_loop(main, urls, stop_at, a.waves))
+    if main.state.shared:
+        jobs.append(sweep_loop(main, stop_at + a.expire + 0.5))
+    await asyncio.gather(*jobs)
+    # let in-flight expiries / wait-list assignments settle
+    await asyncio.sleep(a.expire + 0.5)
+    while main.waitlist_task is not None:
+        await asyncio.sleep(0.05)
+    elapsed = time.monotonic() - t0
+
+    await main.expiry.stop()
+    await main.panel_flips.stop()
+    await main.outbox.stop()
+    main.daily_writer.close()
+
+    sheet = os.path.abspath(os.path.join(main.DATA_DIR, f"{main.sheet_date_str()}.csv"))
+    pooled = [it.url for it in main.state.pool_items()]
+    pending = [main.state.get(uid).url for uid in main.state.pending_users()]
+    main.state.close()
+    return main, sheet, taps, bot.calls, elapsed, pooled, pending
+
+def report(errors: list[str], lines: list[str]) -> int:
+    for line in lines:
+        print(line)
+    if errors:
+        print(f"❌ {len(errors)} violations")
+        for e in errors[:20]:
+            print("   ", e)
+        return 1
+    print("✅ no link assigned twice, none lost")
+    return 0
+
+async def run(a) -> int:
+    workdir = tempfile.mkdtemp(prefix="stress-")
+    a.db = a.db or os.path.join(workdir, "state.sqlite3")
+    main, sheet, taps, calls, elapsed, pooled, pending = await run_worker(a, workdir, adds_links=True)
+    errors, terminal, statuses = check_sheet(sheet, set(stress_urls(a.links)))
+    errors += check_accounting(stress_urls(a.links), pooled, pending, terminal)
+    return report(errors, [
+        f"⏱ {elapsed:.1f}s | {a.backend} | employees {a.employees} | links {a.links} | taps {sum(taps.values())}",
+        f"📋 taps: {dict(taps)}",
+        f"🧾 sheet: {dict(statuses)}",
+        f"📦 end: pool {len(pooled)} | pending {len(pending)} | finished {len(terminal)} | waitlist {len(main.waitlist)}",
+        f"📡 bot calls: {dict(calls)} | outbox {main.outbox.stats()}",
+    ])
+
+def run_workers(a) -> int:
+    # N processes, same employees, one shared DB; worker 0 is the one the owner talks to
+    base = tempfile.mkdtemp(prefix="stress-")
+    db = os.path.join(base, "state.sqlite3")
+    procs = []
+    for i in range(a.workers):
+        wd = os.path.join(base, f"w{i}")
+        os.makedirs(wd)
+        cmd = [sys.executable, os.path.abspath(__file__), "--backend", "sqlite", "--db", db,
+               "--worker", str(i), "--workdir", wd, "--employees", str(a.employees), "--links", str(a.links),
+               "--seconds", str(a.seconds), "--waves", str(a.waves), "--expire", str(a.expire),
+               "--jitter", str(a.jitter), "--double-tap", str(a.double_tap), "--seed", str(a.seed + i)]
+        procs.append(subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True))
+    results = [json.loads(p.communicate()[0].strip().splitlines()[-1]) for p in procs]
+    if any(p.returncode for p in procs):
+        print("❌ a worker crashed")
+        return 1
+
+    sys.path.insert(0, ROOT)
+    from backend import SqliteBackend
+    state = SqliteBackend(db)
+    pooled = [it.url for it in state.pool_items()]
+    pending = [state.get(uid).url for uid in state.pending_users()]
+    state.close()
+
+    urls = stress_urls(a.links)
+    errors, terminal, statuses = check_terminal([r["sheet"] for r in results])
+    errors += check_accounting(urls, pooled, pending, terminal)
+    taps = sum((Counter(r["taps"]) for r in results), Counter())
+    return report(errors, [
+        f"⏱ {max(r['elapsed'] for r in results):.1f}s | sqlite x{a.workers} workers | employees {a.employees} "
+        f"| links {a.links} | taps {sum(taps.values())}",
+        f"📋 taps: {dict(taps)}",
+        f"🧾 sheets: {dict(statuses)}",
+        f"📦 end: pool {len(pooled)} | pending {len(pending)} | finished {len(terminal)}",
+    ])
+
+async def worker_main(a) -> int:
+    _, sheet, taps, calls, elapsed, _, _ = await run_worker(a, a.workdir, adds_links=a.worker == 0)
+    print(json.dumps({"sheet": sheet, "taps": taps, "calls": calls, "elapsed": elapsed}))
+    return 0
+
+def main_cli():
+    ap = argparse.ArgumentParser(description="Concurrent update stress test for main.py")
+    ap.add_argument("--employees", type=int, default=50)
+    ap.add_argument("--links", type=int, default=2000)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--waves", type=int, default=5, help="owner adds links in this many batches")
+    ap.add_argument("--expire", type=float, default=0.3, help="LINK_EXPIRE_SECONDS for the run")
+    ap.add_argument("--jitter", type=float, default=0.01, help="max fake Bot API latency (s)")
+    ap.add_argument("--double-tap", type=float, default=0.2, help="chance a tap is sent twice at once")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    ap.add_argument("--workers", type=int, default=1, help=">1 = separate processes on one sqlite DB")
+    ap.add_argument("--db", default="")
+    ap.add_argument("--worker", type=int, default=-1, help=argparse.SUPPRESS)
+    ap.add_argument("--workdir", default="", help=argparse.SUPPRESS)
+    a = ap.parse_args()
+    random.seed(a.seed)
+    if a.worker >= 0:
+        sys.exit(asyncio.run(worker_main(a)))
+    if a.workers > 1:
+        if a.backend != "sqlite":
+            ap.error("--workers needs --backend sqlite")
+        sys.exit(run_workers(a))
+    sys.exit(asyncio.run(run(a)))
+
+if __name__ == "__main__":
+    main_cli()